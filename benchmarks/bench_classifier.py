@@ -0,0 +1,183 @@
+# benchmarks/bench_classifier.py
+"""Offline accuracy and latency of the local keyword classifier.
+
+    python -m benchmarks.bench_classifier                        # synthetic claim PDFs
+    python -m benchmarks.bench_classifier --scanned 0.3          # some of them OCR'd
+    python -m benchmarks.bench_classifier --samples labels.jsonl # your own samples
+    python -m benchmarks.bench_classifier --source templates     # keyword templates, incl. ID cards
+
+By default the samples are the claim PDFs of benchmarks/synthetic_claims.py, labelled
+by the kind they were generated as, with their text read by the pipeline's own
+extraction (OCR for scanned ones). Those documents were not written from
+CLASSIFIER_KEYWORDS, unlike the page templates below: the templates only check the
+classifier against its own keyword list, so their accuracy is no measure of it.
+
+Each sample ends up in one of three outcomes: handled locally and right, handled
+locally and wrong (a misroute: the wrong extractor runs and nothing catches it), or
+sent to the LLM classifier (a cost, not an error). Fallbacks are split by whether
+the local guess would have been right.
+
+A samples file has one JSON object per line: {"label": "bill", "pages": ["page 1 text", ...]}.
+Labels are 'bill', 'discharge_summary', 'id_card' or 'consolidated_claim'.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+
+# synthetic_claims kinds -> classifier labels
+KIND_LABELS = {"bill": "bill", "discharge_summary": "discharge_summary", "consolidated": "consolidated_claim"}
+
+BILL_PAGE = """{hospital}
+IP FINAL BILL            Bill No: {num}        Bill Date: {date}
+Patient Name: {name}     UHID: {uhid}
+Particulars                     Qty      Rate        Amount
+Room Charges                    3        4500.00     13500.00
+Pharmacy Charges                1        8211.40      8211.40
+Investigation Charges           1        6200.00      6200.00
+GST                                                   1200.00
+Grand Total                                          29111.40
+Amount Paid                                          29111.40
+Net Payable                                              0.00
+"""
+
+SUMMARY_PAGE = """{hospital}
+DISCHARGE SUMMARY
+Patient Name: {name}     UHID: {uhid}
+Date of Admission: {date}     Discharge Date: {date2}
+FINAL DIAGNOSIS: {diagnosis}
+Chief Complaints: fever with chills for 5 days
+History of Present Illness: patient presented with high grade fever.
+Course in Hospital: treated with IV antibiotics and fluids.
+Condition at Discharge: stable. Advice on Discharge: review after 1 week.
+"""
+
+LAB_PAGE = """{hospital}
+LABORATORY REPORT      Patient Name: {name}
+Haemoglobin 13.2 g/dL    WBC 11200 /cumm    Platelets 1.8 lakh/cumm
+Widal test positive      CRP 24 mg/L
+"""
+
+ID_PAGE = """{insurer} Health Card (E-Card)
+Member ID: {uhid}   Name: {name}
+Policy Number: {num}   Group Number: G-{num}   Valid Upto: {date2}   TPA: MediAssist
+"""
+
+HOSPITALS = ["Max Healthcare Saket", "Sir Ganga Ram Hospital", "Apollo Hospital", "Fortis Hospital", "AIIMS"]
+NAMES = ["Rajesh Kumar", "Mary Philo", "Anita Sharma", "Vikram Singh", "Farah Khan"]
+DIAGNOSES = ["TYPHOID FEVER", "DENGUE FEVER", "ACUTE APPENDICITIS", "PNEUMONIA"]
+
+
+def template_samples(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    samples = []
+    for i in range(count):
+        fields = {
+            "hospital": rng.choice(HOSPITALS), "name": rng.choice(NAMES), "num": 100000 + i,
+            "uhid": f"MAX.{rng.randint(100000, 999999)}", "date": "05/02/2025", "date2": "08/02/2025",
+            "diagnosis": rng.choice(DIAGNOSES), "insurer": "Star Health",
+        }
+        label = rng.choice(["bill", "discharge_summary", "id_card", "consolidated_claim"])
+        if label == "bill":
+            pages = [BILL_PAGE]
+        elif label == "discharge_summary":
+            pages = [SUMMARY_PAGE, LAB_PAGE]
+        elif label == "id_card":
+            pages = [ID_PAGE]
+        else:
+            pages = [BILL_PAGE, SUMMARY_PAGE] + [LAB_PAGE] * rng.randint(0, 3)
+            rng.shuffle(pages)
+        samples.append({"label": label, "pages": [p.format(**fields) for p in pages]})
+    return samples
+
+
+def pdf_samples(count: int, scanned_ratio: float = 0.0, seed: int = 7):
+    """synthetic_claims PDFs, one in three of them resubmitted, with their text extracted as the pipeline does."""
+    from benchmarks.synthetic_claims import generate, resubmission
+    from src.executor import shutdown_extraction_executor
+    from src.utils import extract_text_from_pdf_by_page
+
+    claims = generate(count, scanned_ratio=scanned_ratio, seed=seed)
+    # Resubmitted consolidated claims are a lone discharge-summary page: a harder, common case.
+    claims += [resubmission(claim, count + i) for i, claim in enumerate(claims[:count // 3])]
+
+    async def extract():
+        return await asyncio.gather(*(extract_text_from_pdf_by_page(claim.pdf) for claim in claims))
+
+    try:
+        texts = asyncio.run(extract())
+    finally:
+        shutdown_extraction_executor()
+    return [{"label": KIND_LABELS[claim.kind], "pages": pages} for claim, pages in zip(claims, texts)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", help="JSONL file of labelled samples (overrides --source)")
+    parser.add_argument("--source", choices=["pdfs", "templates"], default="pdfs", help="synthetic samples to use")
+    parser.add_argument("--count", type=int, help="synthetic samples (default: 300 PDFs or 2000 templates)")
+    parser.add_argument("--scanned", type=float, default=0.0, help="fraction of the PDFs that are scanned")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--threshold", type=float)
+    args = parser.parse_args()
+
+    # Settings are read at import time; leave the cache out of the measurement.
+    os.environ["CACHE_ENABLED"] = "false"
+    from src.classifier import CLASSIFIER_CONFIDENCE_THRESHOLD, classify_pages
+    threshold = CLASSIFIER_CONFIDENCE_THRESHOLD if args.threshold is None else args.threshold
+
+    if args.samples:
+        with open(args.samples) as f:
+            samples = [json.loads(line) for line in f if line.strip()]
+    elif args.source == "templates":
+        samples = template_samples(args.count or 2000, args.seed)
+    else:
+        samples = pdf_samples(args.count or 300, args.scanned, args.seed)
+
+    latencies, confusion, misroutes = [], Counter(), Counter()
+    correct = local_correct = local_wrong = fallback_correct = fallback_wrong = 0
+    for sample in samples:
+        start = time.perf_counter()
+        result = classify_pages(sample["pages"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        right = result.doc_type == sample["label"]
+        confusion[(sample["label"], result.doc_type)] += 1
+        correct += right
+        if result.confidence >= threshold:
+            local_correct += right
+            local_wrong += not right
+            if not right:
+                misroutes[(sample["label"], result.doc_type)] += 1
+        else:
+            fallback_correct += right
+            fallback_wrong += not right
+
+    n = len(samples)
+    local = local_correct + local_wrong
+    latencies.sort()
+    print(f"samples:              {n}")
+    print(f"accuracy:             {correct / n:.3f}  (local guess, any confidence)")
+    print(f"handled locally:      {local / n:.3f}  (confidence >= {threshold})")
+    print(f"  correct:            {local_correct / n:.3f}")
+    print(f"  misrouted:          {local_wrong / n:.3f}  ({local_wrong} wrong with no LLM check)")
+    print(f"accuracy when local:  {local_correct / max(local, 1):.3f}")
+    print(f"sent to LLM:          {(n - local) / n:.3f}")
+    print(f"  local guess right:  {fallback_correct / n:.3f}  (an LLM call the threshold could have saved)")
+    print(f"  local guess wrong:  {fallback_wrong / n:.3f}  (caught by the fallback)")
+    print(f"latency ms p50/p95/max: {statistics.median(latencies):.3f} / "
+          f"{latencies[int(0.95 * (n - 1))]:.3f} / {latencies[-1]:.3f}")
+    print("\nconfusion (label -> predicted):")
+    for (label, predicted), count in sorted(confusion.items()):
+        print(f"  {label:<20} -> {predicted:<20} {count}")
+    if misroutes:
+        print("\nmisrouted locally (label -> predicted):")
+        for (label, predicted), count in sorted(misroutes.items()):
+            print(f"  {label:<20} -> {predicted:<20} {count}")
+
+
+if __name__ == "__main__":
+    main()
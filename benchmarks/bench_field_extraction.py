@@ -0,0 +1,134 @@
+# benchmarks/bench_field_extraction.py
+"""Regex fallback engine: regression corpus and micro-benchmark against the old per-field regexes.
+
+    python -m benchmarks.bench_field_extraction            # check the corpus, then time both
+    python -m benchmarks.bench_field_extraction --check    # corpus only; exits 1 on any mismatch
+
+The corpus (benchmarks/data/field_extraction_corpus.jsonl) has one case per line:
+{"name": ..., "text": ..., "expected": {"policy_id": ..., "total_amount": ..., ...}}.
+An expected value of null means the field must not be found.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.bench_classifier import LAB_PAGE, template_samples
+from src.field_extraction import best_fields
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "field_extraction_corpus.jsonl")
+
+
+# The per-field helpers as they were before the single-pass engine, kept for comparison.
+def legacy_policy_id(text):
+    match = re.search(r"MaxID\s*[:\-]?\s*([A-Z0-9./\-]+)", text, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    match = re.search(r"Patient\s*ID\s*[:\-]?\s*([A-Z0-9./\-]+)", text, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    match = re.search(
+        r"(Episode\s*ID|UHID|Policy\s*(No|Number)|Claim\s*Number|CCN)[\s:]*([A-Z0-9./\-]+)", text, re.IGNORECASE
+    )
+    return match.group(3).strip() if match else None
+
+
+def legacy_date(text, labels):
+    for label in labels:
+        match = re.search(rf"{label}\s*[:\-]?\s*(\d{{1,2}}[/-]\d{{1,2}}[/-]\d{{2,4}})", text, re.IGNORECASE)
+        if match:
+            for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%Y/%m/%d"):
+                try:
+                    return datetime.strptime(match.group(1).strip(), fmt).strftime("%Y-%m-%d")
+                except ValueError:
+                    continue
+            return None
+    return None
+
+
+def legacy_total_amount(text):
+    amounts = re.findall(r"[0-9]+(?:\\.[0-9]{1,2})?", text.replace(",", ""))
+    return float(max(amounts, key=float)) if amounts else None
+
+
+def legacy_diagnosis(text):
+    match = re.search(r"(?:DIAGNOSIS|FINAL DIAGNOSIS)[:\-\s]*([\s\S]{0,200})", text, re.IGNORECASE)
+    if not match:
+        return None
+    lines = match.group(1).strip().split("\n")[0:3]
+    return "; ".join(line.strip() for line in lines if line.strip()) or None
+
+
+def legacy_all(text):
+    return {
+        "policy_id": legacy_policy_id(text),
+        "discharge_date": legacy_date(text, ["Discharge Date", "Discharged On"]),
+        "admission_date": legacy_date(text, ["Date of Admission", "Admission Date"]),
+        "total_amount": legacy_total_amount(text),
+        "diagnosis": legacy_diagnosis(text),
+    }
+
+
+def engine_all(text):
+    return {field: candidate.value for field, candidate in best_fields(text).items()}
+
+
+def check_corpus(path):
+    failures, total = 0, 0
+    with open(path) as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    for case in cases:
+        found = engine_all(case["text"])
+        for field, expected in case["expected"].items():
+            total += 1
+            got = found.get(field)
+            if got != expected:
+                failures += 1
+                print(f"  FAIL {case['name']}: {field} = {got!r}, expected {expected!r}")
+    print(f"corpus: {len(cases)} cases, {total - failures}/{total} fields correct")
+    return failures == 0
+
+
+def _time(fn, texts, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        runs.append((time.perf_counter() - start) * 1000 / len(texts))
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--check", action="store_true", help="only run the regression corpus")
+    parser.add_argument("--count", type=int, default=500, help="number of synthetic documents to time")
+    parser.add_argument("--lab-pages", type=int, default=30, help="lab pages appended for the long-document run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ok = check_corpus(args.corpus)
+    if args.check:
+        sys.exit(0 if ok else 1)
+
+    short = ["\n".join(sample["pages"]) for sample in template_samples(args.count)]
+    # Long claims: the same documents followed by a stack of lab reports.
+    lab = LAB_PAGE.format(hospital="Apollo Hospital", name="Anita Sharma")
+    long = [text + lab * args.lab_pages for text in short[: max(args.count // 10, 1)]]
+    for name, texts in (("short", short), (f"+{args.lab_pages} lab pages", long)):
+        chars = sum(len(t) for t in texts) / len(texts)
+        legacy_ms = _time(legacy_all, texts, args.repeat)
+        engine_ms = _time(engine_all, texts, args.repeat)
+        print(f"\n{name}: {len(texts)} documents, avg {chars:.0f} chars")
+        print(f"  legacy ms/doc:        {legacy_ms:.4f}")
+        print(f"  single-pass ms/doc:   {engine_ms:.4f}  ({legacy_ms / engine_ms:.1f}x)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
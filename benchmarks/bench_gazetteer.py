@@ -0,0 +1,116 @@
+# benchmarks/bench_gazetteer.py
+"""Hospital gazetteer lookup cost as the gazetteer grows, against a linear scan.
+
+    python -m benchmarks.bench_gazetteer
+    python -m benchmarks.bench_gazetteer --sizes 1000 10000 100000 --queries 200
+
+Synthetic hospitals ("<Name> <Suffix> <City>") are generated for each size. Exact
+lookups search a short bill header; fuzzy lookups search the same header with
+OCR-style character errors. The linear scan is what a dict of keywords does: test
+every alias against the text (substring for exact, difflib per line for fuzzy).
+"""
+import argparse
+import difflib
+import random
+import statistics
+import time
+
+from src.gazetteer import Gazetteer, normalize
+
+SYLLABLES = [
+    "ra", "ma", "shi", "van", "ka", "lo", "dev", "pra", "sun", "ga", "ti", "nan", "ja", "ya", "ved", "ku",
+    "bha", "dhi", "gur", "har", "in", "jee", "kir", "lak", "mo", "nir", "om", "pad", "ru", "sa", "tej", "u",
+    "vi", "yo", "zee", "chan", "dra", "esh", "fal", "goh", "hem", "ish", "jyo", "kal", "lin", "mur", "nav",
+]
+SUFFIXES = ["Hospital", "Hospitals", "Medical Centre", "Multispeciality Hospital", "Nursing Home", "Clinic"]
+CITIES = ["Delhi", "Pune", "Chennai", "Kolkata", "Jaipur", "Lucknow", "Indore", "Mysuru", "Nagpur", "Surat"]
+OCR_CONFUSIONS = {"l": "1", "o": "0", "i": "l", "m": "rn", "s": "5", "a": "o"}
+
+
+def synthetic_rows(count, rng):
+    """Unique "<Base> <Suffix> <City>" names, each with the city-less form as an alias."""
+    rows, seen = [], set()
+    while len(rows) < count:
+        base = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))).capitalize()
+        if base in seen:
+            continue
+        seen.add(base)
+        short = f"{base} {rng.choice(SUFFIXES)}"
+        rows.append((f"{short} {rng.choice(CITIES)}", [short]))
+    return rows
+
+
+def ocr_noise(text, rng, rate=0.08):
+    return "".join(OCR_CONFUSIONS[c] if c in OCR_CONFUSIONS and rng.random() < rate else c for c in text)
+
+
+def header(name):
+    return f"{name}\nIP FINAL BILL   Bill No: 100231   Bill Date: 05/02/2025\nPatient Name: Rajesh Kumar   UHID: 4417382"
+
+
+def linear_exact(aliases, text):
+    normalized = f" {normalize(text)} "
+    return next((name for alias, name in aliases if f" {alias} " in normalized), None)
+
+
+def linear_fuzzy(aliases, text, threshold):
+    best, best_score = None, threshold
+    for line in text.splitlines()[:10]:
+        line = normalize(line)
+        for alias, name in aliases:
+            score = difflib.SequenceMatcher(None, alias, line).ratio()
+            if score >= best_score:
+                best, best_score = name, score
+    return best
+
+
+def _time_us(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) * 1e6 / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--linear-max", type=int, default=10000, help="skip the linear scan above this size")
+    args = parser.parse_args()
+
+    print(f"{'hospitals':>10} {'build ms':>9} {'exact us':>9} {'fuzzy us':>9} {'fuzzy hit':>9} "
+          f"{'linear exact us':>16} {'linear fuzzy us':>16}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        rows = synthetic_rows(size, rng)
+        start = time.perf_counter()
+        gazetteer = Gazetteer(rows=rows)
+        len(gazetteer)  # force the build
+        build_ms = (time.perf_counter() - start) * 1000
+
+        targets = [rng.choice(rows)[0] for _ in range(args.queries)]
+        clean = [header(name) for name in targets]
+        noisy = [header(ocr_noise(name, rng)) for name in targets]
+        exact_us, _ = _time_us(gazetteer.match, clean)
+        fuzzy_us, found = _time_us(lambda q: gazetteer.match(q, fuzzy=True), noisy)
+        hit_rate = sum(m is not None and m.name == t for m, t in zip(found, targets)) / len(targets)
+
+        linear = "-", "-"
+        if size <= args.linear_max:
+            aliases = [(normalize(alias), name) for name, extra in rows for alias in [name, *extra]]
+            few = max(args.queries // 20, 1)  # the fuzzy scan is slow; time a sample
+            linear_exact_us, _ = _time_us(lambda q: linear_exact(aliases, q), clean)
+            linear_fuzzy_us, _ = _time_us(lambda q: linear_fuzzy(aliases, q, 0.82), noisy[:few])
+            linear = f"{linear_exact_us:.0f}", f"{linear_fuzzy_us:.0f}"
+        print(f"{size:>10} {build_ms:>9.0f} {exact_us:>9.1f} {fuzzy_us:>9.1f} {hit_rate:>9.2f} "
+              f"{linear[0]:>16} {linear[1]:>16}")
+
+    latencies = []
+    for _ in range(5):
+        start = time.perf_counter()
+        Gazetteer().match(header("Apollo Hospitals"))
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"\nbundled gazetteer: load + first lookup {statistics.median(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# benchmarks/bench_grouping.py
+"""Claim grouping speed and accuracy on synthetic batches.
+
+    python -m benchmarks.bench_grouping
+    python -m benchmarks.bench_grouping --sizes 10000 50000 100000 --all-pairs-max 2000
+    python -m benchmarks.bench_grouping --collision-rate 0.2
+
+Each synthetic claim has a bill, a discharge summary and sometimes an ID card. Names
+are written inconsistently across a claim's documents (case, punctuation, honorifics,
+word order, one-letter typos) and some documents have no name at all. A share of the
+claims (--collision-rate) belong to a different patient with exactly the same name as
+an earlier claim, on another policy and usually another hospital; merging those
+shows up as lost precision. Accuracy is
+pairwise: precision and recall of "same claim" over document pairs, against
+  exact     - the old grouping by exact patient_name (nameless documents dropped)
+  all-pairs - fuzzy-compare every pair of names (quadratic; small batches only)
+"""
+import argparse
+import random
+import string
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from src.grouping import _DisjointSet, group_documents, names_match, normalize_name
+from src.schemas import Bill, DischargeSummary, IDCard
+
+FIRST = ["Rajesh", "Mary", "Anita", "Vikram", "Farah", "Suresh", "Priya", "Amit", "Neha", "Arjun", "Kavya", "Rohan",
+         "Sunita", "Imran", "Deepa", "Manoj", "Pooja", "Sanjay", "Lakshmi", "Vivek"]
+LAST = ["Kumar", "Philo", "Sharma", "Singh", "Khan", "Patel", "Reddy", "Iyer", "Gupta", "Das", "Nair", "Mehta",
+        "Joshi", "Rao", "Bose", "Menon", "Verma", "Chopra", "Pillai", "Ghosh"]
+HOSPITALS = ["Apollo Hospital", "Fortis Hospital", "Max Healthcare", "Sir Ganga Ram Hospital", "AIIMS", "Medanta",
+             "Manipal Hospital", "Narayana Health", "Jaslok Hospital", "Ruby Hall Clinic"]
+
+
+def _variant(name, rng):
+    """The same name as another document might have written it."""
+    roll = rng.random()
+    if roll < 0.3:
+        return name
+    if roll < 0.45:
+        return name.upper()
+    if roll < 0.6:
+        return name + "."
+    if roll < 0.7:
+        return "Mr. " + name
+    if roll < 0.8:
+        return " ".join(reversed(name.split()))
+    # One mistyped letter in the longest word.
+    words = name.split()
+    w = max(range(len(words)), key=lambda k: len(words[k]))
+    i = rng.randrange(1, len(words[w]))
+    words[w] = words[w][:i] + rng.choice(string.ascii_lowercase) + words[w][i + 1:]
+    return " ".join(words)
+
+
+def synthetic_batch(documents, rng, collision_rate=0.0):
+    """Returns (docs, claim index per doc)."""
+    docs, truth, used_names = [], [], []
+    start = date(2025, 1, 1).toordinal()
+    claim = 0
+    while len(docs) < documents:
+        if used_names and rng.random() < collision_rate:
+            # Another patient who happens to share an earlier patient's full name.
+            name = rng.choice(used_names)
+        else:
+            # Middle names keep distinct patients from colliding on a small name list.
+            name = f"{rng.choice(FIRST)} {rng.choice(string.ascii_uppercase)}{rng.choice('aeiou')}" \
+                   f"{rng.choice('nrsl')} {rng.choice(LAST)}"
+            used_names.append(name)
+        hospital = rng.choice(HOSPITALS)
+        policy = f"POL-{rng.randrange(10**9):09d}"
+        admitted = date.fromordinal(start + rng.randrange(365))
+        discharged = admitted + timedelta(days=rng.randint(1, 10))
+
+        def named():
+            return None if rng.random() < 0.05 else _variant(name, rng)
+
+        claim_docs = [
+            Bill(patient_name=named(), hospital_name=hospital, total_amount=rng.randint(5, 500) * 1000.0,
+                 date_of_service=discharged.isoformat(), policy_id=policy if rng.random() < 0.7 else None),
+            DischargeSummary(patient_name=named(), hospital_name=hospital, diagnosis="FEVER",
+                             admission_date=admitted.isoformat(), discharge_date=discharged.isoformat()),
+        ]
+        if rng.random() < 0.3:
+            claim_docs.append(IDCard(patient_name=named(), policy_id=policy))
+        docs.extend(claim_docs)
+        truth.extend([claim] * len(claim_docs))
+        claim += 1
+    return docs, truth
+
+
+def exact_grouping(docs):
+    groups = defaultdict(list)
+    for i, doc in enumerate(docs):
+        if doc.patient_name:
+            groups[doc.patient_name].append(i)
+    return list(groups.values())
+
+
+def all_pairs_grouping(docs):
+    names = [normalize_name(doc.patient_name) for doc in docs]
+    groups = _DisjointSet(len(docs))
+    for i in range(len(docs)):
+        for j in range(i + 1, len(docs)):
+            if names[i] and names[j] and names_match(names[i], names[j]):
+                groups.union(i, j)
+    members = defaultdict(list)
+    for i in range(len(docs)):
+        members[groups.find(i)].append(i)
+    return list(members.values())
+
+
+def indexed_grouping(docs):
+    position = {id(doc): i for i, doc in enumerate(docs)}
+    return [[position[id(doc)] for doc in group] for _, group in group_documents(docs)]
+
+
+def pair_scores(groups, truth):
+    """Pairwise precision / recall of predicted groups against the true claim of each doc."""
+    predicted = true_positive = 0
+    for group in groups:
+        predicted += len(group) * (len(group) - 1) // 2
+        per_claim = defaultdict(int)
+        for i in group:
+            per_claim[truth[i]] += 1
+        true_positive += sum(n * (n - 1) // 2 for n in per_claim.values())
+    sizes = defaultdict(int)
+    for claim in truth:
+        sizes[claim] += 1
+    actual = sum(n * (n - 1) // 2 for n in sizes.values())
+    return true_positive / max(predicted, 1), true_positive / max(actual, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="documents per batch")
+    parser.add_argument("--all-pairs-max", type=int, default=1000, help="skip the quadratic baseline above this")
+    parser.add_argument("--collision-rate", type=float, default=0.05,
+                        help="fraction of claims reusing an earlier patient's exact name (0-1)")
+    args = parser.parse_args()
+
+    print(f"{'docs':>7} {'method':<10} {'seconds':>8} {'docs/s':>9} {'claims':>7} {'precision':>9} {'recall':>7}")
+    for size in args.sizes:
+        docs, truth = synthetic_batch(size, random.Random(size), args.collision_rate)
+        methods = [("exact", exact_grouping), ("indexed", indexed_grouping)]
+        if size <= args.all_pairs_max:
+            methods.append(("all-pairs", all_pairs_grouping))
+        for name, grouping in methods:
+            start = time.perf_counter()
+            groups = grouping(docs)
+            seconds = time.perf_counter() - start
+            precision, recall = pair_scores(groups, truth)
+            print(f"{len(docs):>7} {name:<10} {seconds:>8.3f} {len(docs) / seconds:>9.0f} {len(groups):>7} "
+                  f"{precision:>9.3f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+# benchmarks/bench_pipeline.py
+"""End-to-end /process-claim-batch benchmark, fully offline.
+
+    python -m benchmarks.bench_pipeline                              # every scenario
+    python -m benchmarks.bench_pipeline --scenario digital --files 50
+    python -m benchmarks.bench_pipeline --output results.json
+    python -m benchmarks.bench_pipeline --baseline results.json     # exit 1 on a regression
+
+Each scenario generates synthetic claim PDFs (benchmarks/synthetic_claims.py), starts
+the fake OpenAI server (benchmarks/fake_llm.py) in a subprocess and posts the batch to
+the FastAPI app in-process. It reports files per second, p50/p95/p99 latency of each
+pipeline stage (LLM calls per model tier), LLM retries, how often the fast tier was
+escalated, and the peak RSS of the app plus its extraction workers. A scenario in
+which any file fails or the claim count differs from the claims generated fails the
+run (exit 1), so a broken pipeline never produces timings.
+Only Tesseract is needed beyond requirements.txt, and only for scanned scenarios
+(apt install tesseract-ocr). The caches are off unless --cache is given, so repeated
+runs measure the same work.
+"""
+import argparse
+import asyncio
+import functools
+import importlib
+import inspect
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+
+@dataclass
+class Scenario:
+    files: int
+    kinds: List[str]
+    scanned_ratio: float = 0.0
+    llm_latency: float = 0.3
+    llm_jitter: float = 0.1
+    failure_rate: float = 0.0
+    # Fraction of the fast model tier's answers the fake server makes implausible.
+    fast_degrade_rate: float = 0.0
+    # Fraction of the claims sent a second time in the same batch (synthetic_claims.resubmission).
+    resubmitted_ratio: float = 0.0
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "digital": Scenario(files=20, kinds=["consolidated"]),
+    "mixed": Scenario(files=24, kinds=["bill", "discharge_summary", "consolidated"], scanned_ratio=0.25),
+    "scanned": Scenario(files=6, kinds=["consolidated"], scanned_ratio=1.0),
+    "flaky_llm": Scenario(files=20, kinds=["consolidated"], failure_rate=0.1),
+    "slow_llm": Scenario(files=20, kinds=["consolidated"], llm_latency=2.0, llm_jitter=0.5),
+    "escalation": Scenario(files=20, kinds=["bill", "discharge_summary", "consolidated"], fast_degrade_rate=0.3),
+    "resubmitted": Scenario(files=20, kinds=["consolidated", "bill"], resubmitted_ratio=0.5),
+}
+
+# (module, attribute, stage) wrapped with timers. Names are looked up at call time,
+# so replacing the module attributes times every call the pipeline makes.
+STAGES = [
+    ("src.pipeline", "_extract_file", "file"),
+    ("src.pipeline", "extract_text_from_pdf_by_page", "text_extraction"),
+    ("src.pipeline", "classify_pages", "classification"),
+    ("src.pipeline", "combined_extraction_agent", "extraction"),
+    ("src.pipeline", "targeted_extraction_agent", "extraction"),
+    ("src.pipeline", "regex_first_extraction_agent", "extraction"),
+    ("src.pipeline", "group_documents", "grouping"),
+    ("src.pipeline", "validate_claims", "validation"),
+]
+
+# Relative slack before --baseline calls a difference a regression.
+DEFAULT_TOLERANCE = 0.25
+RSS_SAMPLE_SECONDS = 0.05
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (0 < q <= 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * q / 100), 1) - 1]
+
+
+class StageTimer:
+    """Records the wall time of every call to the pipeline functions in STAGES, by stage.
+
+    Used as a context manager: the functions are wrapped on entry and restored on exit.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._originals: Dict[tuple, object] = {}
+
+    def wrap(self, fn, stage: str, by_model: bool = False):
+        """`by_model` records calls as "<stage>:<model keyword argument>"."""
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    name = f"{stage}:{kwargs.get('model')}" if by_model else stage
+                    self.samples[name].append(time.perf_counter() - start)
+        else:
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+    def __enter__(self):
+        from src.llm_client import llm_client
+        for module_name, attr, stage in STAGES:
+            module = importlib.import_module(module_name)
+            self._originals[(module_name, attr)] = getattr(module, attr)
+            setattr(module, attr, self.wrap(getattr(module, attr), stage))
+        llm_client.chat = self.wrap(llm_client.chat, "llm_call", by_model=True)
+        return self
+
+    def __exit__(self, *exc):
+        from src.llm_client import llm_client
+        for (module_name, attr), fn in self._originals.items():
+            setattr(importlib.import_module(module_name), attr, fn)
+        llm_client.__dict__.pop("chat", None)
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for stage, values in self.samples.items()
+        }
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _descendants(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(c) for c in f.read().split()]
+    except OSError:
+        return []
+    return children + [d for c in children for d in _descendants(c)]
+
+
+class PeakRSS:
+    """Samples the RSS of this process plus its descendants (the extraction pool) in the background."""
+
+    def __init__(self, exclude: List[int]):
+        self.exclude = set(exclude)
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            pids = [pid] + [p for p in _descendants(pid) if p not in self.exclude]
+            self.peak_kb = max(self.peak_kb, sum(_rss_kb(p) for p in pids))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_llm(scenario: Scenario, seed: int) -> tuple:
+    from src.routing import OPENAI_FAST_MODEL
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.fake_llm", "--port", str(port),
+        "--latency", str(scenario.llm_latency), "--jitter", str(scenario.llm_jitter),
+        "--failure-rate", str(scenario.failure_rate), "--seed", str(seed),
+    ]
+    if scenario.fast_degrade_rate and OPENAI_FAST_MODEL:
+        command += ["--degraded-model", OPENAI_FAST_MODEL, "--degrade-rate", str(scenario.fast_degrade_rate)]
+    process = subprocess.Popen(command)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base}/stats", timeout=1).read()
+            return process, base
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake LLM server did not start")
+
+
+def fake_llm_stats(base: str) -> dict:
+    return json.loads(urllib.request.urlopen(f"{base}/stats", timeout=5).read())
+
+
+async def post_batch(app, claims) -> dict:
+    import httpx
+    files = [("files", (c.filename, c.pdf, "application/pdf")) for c in claims]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        response = await client.post("/process-claim-batch", files=files)
+    response.raise_for_status()
+    return response.json()
+
+
+def file_outcomes() -> Dict[str, int]:
+    """claim_files_total so far, by outcome (ok or error)."""
+    from src.metrics import FILES
+    return {outcome: int(value) for (outcome,), value in FILES.values().items()}
+
+
+def routing_counts() -> Dict[str, int]:
+    """claim_llm_routing_total so far, summed over purposes, by outcome."""
+    from src.metrics import ROUTING
+    counts: Dict[str, int] = defaultdict(int)
+    for (_, outcome), value in ROUTING.values().items():
+        counts[outcome] += int(value)
+    return counts
+
+
+def run_scenario(name: str, scenario: Scenario, args) -> dict:
+    from benchmarks.synthetic_claims import generate, resubmission
+    from src.llm_client import llm_client
+    from src.main import app
+
+    claims = generate(scenario.files, scenario.kinds, scenario.scanned_ratio, seed=args.seed)
+    expected_claims = len(claims)
+    resubmitted = int(len(claims) * scenario.resubmitted_ratio)
+    claims += [resubmission(claim, len(claims) + i) for i, claim in enumerate(claims[:resubmitted])]
+    process, base = start_fake_llm(scenario, args.seed)
+    os.environ["OPENAI_BASE_URL"] = f"{base}/v1"
+    try:
+        if not args.no_warmup:
+            llm_client._client = None  # rebind to this scenario's server
+            asyncio.run(post_batch(app, generate(1, scenario.kinds, scenario.scanned_ratio, seed=args.seed + 1)))
+        # The AsyncOpenAI client is bound to the event loop it first ran on, and every
+        # asyncio.run() closes its loop: the measured batch needs a client of its own.
+        llm_client._client = None
+        llm_client.counters.clear()
+        routed_before = routing_counts()
+        files_before = file_outcomes()
+        with StageTimer() as timer, PeakRSS(exclude=[process.pid]) as rss:
+            start = time.perf_counter()
+            result = asyncio.run(post_batch(app, claims))
+            seconds = time.perf_counter() - start
+        server = fake_llm_stats(base)
+        routing = {outcome: count - routed_before.get(outcome, 0) for outcome, count in routing_counts().items()}
+        files = {outcome: count - files_before.get(outcome, 0) for outcome, count in file_outcomes().items()}
+    finally:
+        process.terminate()
+        process.wait()
+
+    decisions = [c["claim_decision"]["status"] for c in result["processed_claims"]]
+    routed = sum(routing.values())
+    escalated = routing.get("escalated", 0) + routing.get("escalated_fields", 0)
+    # A run that lost files or claims measured less work than it reports; it must not pass.
+    problems = []
+    if files.get("error"):
+        problems.append(f"{files['error']} of {len(claims)} files failed extraction")
+    if len(decisions) != expected_claims:
+        problems.append(f"{len(decisions)} claims from {expected_claims} generated")
+    return {
+        "scenario": name,
+        "config": asdict(scenario),
+        "files": len(claims),
+        "seconds": round(seconds, 3),
+        "files_per_second": round(len(claims) / seconds, 3),
+        "claims": len(decisions),
+        "duplicates": len(result.get("duplicates", [])),
+        "approved": decisions.count("approved"),
+        "problems": problems,
+        "peak_rss_mb": round(rss.peak_kb / 1024, 1),
+        "stages": timer.report(),
+        "llm": {
+            "retries": llm_client.counters.get("retries", 0),
+            "routing": {outcome: count for outcome, count in routing.items() if count},
+            "escalation_rate": round(escalated / routed, 3) if routed else 0.0,
+            "server": server,
+        },
+    }
+
+
+def print_result(result: dict) -> None:
+    print(f"\n=== {result['scenario']}: {result['files']} files in {result['seconds']:.2f}s "
+          f"({result['files_per_second']:.2f} files/s), {result['claims']} claims, {result['approved']} approved, "
+          f"{result['duplicates']} duplicate files, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB, {result['llm']['retries']} LLM retries, "
+          f"{result['llm']['escalation_rate']:.0%} escalated")
+    print(f"  {'stage':<28} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for stage, s in result["stages"].items():
+        print(f"  {stage:<28} {s['count']:>6} {s['p50_ms']:>10.1f} {s['p95_ms']:>10.1f} {s['p99_ms']:>10.1f}")
+    for problem in result["problems"]:
+        print(f"  FAILED: {problem}")
+
+
+def regressions(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Throughput drops and p95 / peak RSS growth beyond `tolerance` against a saved run."""
+    previous = {r["scenario"]: r for r in baseline}
+    found = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        name = result["scenario"]
+        if result["files_per_second"] < before["files_per_second"] * (1 - tolerance):
+            found.append(f"{name}: files/s {before['files_per_second']} -> {result['files_per_second']}")
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            found.append(f"{name}: peak RSS {before['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+        for stage, s in result["stages"].items():
+            old = before["stages"].get(stage)
+            if old and s["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                found.append(f"{name}: {stage} p95 {old['p95_ms']} -> {s['p95_ms']} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="default: all")
+    parser.add_argument("--files", type=int, help="override the number of files per scenario")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cache", action="store_true", help="leave the text / LLM caches on")
+    parser.add_argument("--no-warmup", action="store_true", help="include process-pool startup in the timings")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --output run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    # Settings are read at import time, so the environment is set before importing src.
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.environ["OPENAI_API_KEY"] = "fake"
+    os.environ["JOBS_DB_PATH"] = os.path.join(workdir, "jobs.sqlite3")
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["CHECKPOINT_ENABLED"] = "false"
+    if not args.cache:
+        os.environ["CACHE_ENABLED"] = "false"
+
+    from src.executor import shutdown_extraction_executor
+    results = []
+    try:
+        for name in args.scenario or list(SCENARIOS):
+            scenario = SCENARIOS[name]
+            if args.files:
+                scenario = Scenario(**{**asdict(scenario), "files": args.files})
+            results.append(run_scenario(name, scenario, args))
+            print_result(results[-1])
+    finally:
+        shutdown_extraction_executor()
+
+    failed = [r["scenario"] for r in results if r["problems"]]
+    if failed:
+        print(f"\nScenario(s) did not process every file: {', '.join(failed)}; no results written")
+        sys.exit(1)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        print(f"\n{len(found)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%})")
+        for line in found:
+            print(f"  {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# benchmarks/bench_startup.py
+"""Cold-start benchmark: how long a fresh API process takes to import, become ready and answer.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+    python -m benchmarks.bench_startup --baseline startup.json     # exit 1 on a regression
+
+Every run is a new Python process, as on a freshly scheduled pod. It times the import
+of src.main, records which heavy libraries that import pulled in, runs the app's
+lifespan, waits for GET /ready, and posts one synthetic claim (then a second) to
+/process-claim-batch against the fake OpenAI server (benchmarks/fake_llm.py).
+Two modes are measured: "warmup" (WARMUP_ON_STARTUP=true, the default) and "lazy"
+(warm-up off, so the first request loads everything itself). Medians over --runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Libraries that importing src.main should no longer load.
+HEAVY_MODULES = ["langgraph", "openai", "pdfplumber", "pymupdf", "pdf2image", "pytesseract", "PIL", "PyPDF2"]
+
+MODES = {"warmup": "true", "lazy": "false"}
+TIMINGS = ["import_s", "ready_s", "first_request_s", "second_request_s", "time_to_first_response_s"]
+READY_POLL_SECONDS = 0.01
+
+# Relative slack before --baseline calls a difference a regression.
+DEFAULT_TOLERANCE = 0.25
+
+
+def child(pdf_path: str) -> None:
+    """One cold start; prints its timings as JSON. Runs in the measured process."""
+    start = time.perf_counter()
+    from src.main import app
+    imported = time.perf_counter()
+    loaded = sorted(name for name in HEAVY_MODULES if name in sys.modules)
+
+    import httpx
+
+    with open(pdf_path, "rb") as f:
+        pdf = f.read()
+
+    async def post(client) -> float:
+        request_start = time.perf_counter()
+        response = await client.post("/process-claim-batch",
+                                     files=[("files", (os.path.basename(pdf_path), pdf, "application/pdf"))])
+        response.raise_for_status()
+        return time.perf_counter() - request_start
+
+    async def run() -> dict:
+        # httpx's ASGI transport doesn't run the lifespan; enter it the way uvicorn does.
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                         timeout=None) as client:
+                while (await client.get("/ready")).status_code != 200:
+                    await asyncio.sleep(READY_POLL_SECONDS)
+                ready = time.perf_counter()
+                first = await post(client)
+                second = await post(client)
+        return {
+            "import_s": round(imported - start, 4),
+            "ready_s": round(ready - start, 4),
+            "first_request_s": round(first, 4),
+            "second_request_s": round(second, 4),
+            "time_to_first_response_s": round(ready - start + first, 4),
+            "loaded_at_import": loaded,
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def run_once(mode: str, pdf_path: str, env: Dict[str, str]) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", pdf_path],
+        env={**env, "WARMUP_ON_STARTUP": MODES[mode]}, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_mode(mode: str, runs: int, pdf_path: str, env: Dict[str, str]) -> dict:
+    samples = [run_once(mode, pdf_path, env) for _ in range(runs)]
+    result = {"mode": mode, "runs": runs}
+    for timing in TIMINGS:
+        result[timing] = round(statistics.median(s[timing] for s in samples), 4)
+    result["loaded_at_import"] = sorted({name for s in samples for name in s["loaded_at_import"]})
+    return result
+
+
+def print_result(result: dict) -> None:
+    print(f"\n=== {result['mode']}: median of {result['runs']} cold start(s)")
+    for timing in TIMINGS:
+        print(f"  {timing:<28} {result[timing] * 1000:>10.1f} ms")
+    print(f"  heavy modules loaded by import: {', '.join(result['loaded_at_import']) or 'none'}")
+
+
+def regressions(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Timings grown beyond `tolerance`, and heavy modules newly loaded at import, against a saved run."""
+    previous = {r["mode"]: r for r in baseline}
+    found = []
+    for result in results:
+        before = previous.get(result["mode"])
+        if before is None:
+            continue
+        name = result["mode"]
+        for timing in TIMINGS:
+            if result[timing] > before[timing] * (1 + tolerance):
+                found.append(f"{name}: {timing} {before[timing]} -> {result[timing]}")
+        added = set(result["loaded_at_import"]) - set(before["loaded_at_import"])
+        if added:
+            found.append(f"{name}: import now loads {', '.join(sorted(added))}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=MODES, action="append", help="default: all")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per mode")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --output run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--child", metavar="PDF", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    from benchmarks.bench_pipeline import Scenario, start_fake_llm
+    from benchmarks.synthetic_claims import generate
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    claim = generate(1, ["consolidated"], seed=args.seed)[0]
+    pdf_path = os.path.join(workdir, claim.filename)
+    with open(pdf_path, "wb") as f:
+        f.write(claim.pdf)
+
+    process, base = start_fake_llm(Scenario(files=1, kinds=["consolidated"], llm_latency=0.05, llm_jitter=0.0),
+                                   args.seed)
+    # Caches and checkpoints off, so every cold start does the same work.
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"{base}/v1",
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "CACHE_ENABLED": "false",
+        "CHECKPOINT_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    results = []
+    try:
+        for mode in args.mode or list(MODES):
+            results.append(run_mode(mode, args.runs, pdf_path, env))
+            print_result(results[-1])
+    finally:
+        process.terminate()
+        process.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        print(f"\n{len(found)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%})")
+        for line in found:
+            print(f"  {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_text_backends.py
+"""Compares text-layer backends on pages per second.
+
+    python -m benchmarks.bench_text_backends                 # synthetic 50-page PDF
+    python -m benchmarks.bench_text_backends claim1.pdf ...  # your own files
+"""
+import argparse
+import time
+
+import pymupdf
+
+from src.utils import TEXT_LAYER_BACKENDS, page_needs_ocr
+
+SAMPLE_LINES = [
+    "Max Healthcare - Super Speciality Hospital, Saket",
+    "Patient Name: Rajesh Kumar        MaxID: SKDD.1234567",
+    "Bill Date: 07/02/2025            Admission Date: 05/02/2025",
+    "Room Rent                                   12,500.00",
+    "Pharmacy                                     4,321.50",
+    "Grand Total                                 16,821.50",
+]
+
+
+def synthetic_pdf(pages: int) -> bytes:
+    doc = pymupdf.open()
+    for n in range(pages):
+        page = doc.new_page()
+        for i, line in enumerate(SAMPLE_LINES * 6):
+            page.insert_text((50, 60 + i * 20), f"{line} [{n}]", fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="PDF files to benchmark (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=50, help="pages in the synthetic PDF")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    blobs = [open(path, "rb").read() for path in args.files] or [synthetic_pdf(args.pages)]
+
+    print(f"{'backend':<12} {'pages':>7} {'seconds':>9} {'pages/s':>9} {'ocr pages':>10}")
+    for name, extract in TEXT_LAYER_BACKENDS.items():
+        pages = ocr_pages = 0
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for blob in blobs:
+                texts = extract(blob)
+                pages += len(texts)
+                ocr_pages += sum(page_needs_ocr(t) for t in texts)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {pages:>7} {elapsed:>9.3f} {pages / elapsed:>9.1f} {ocr_pages // args.repeat:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# benchmarks/fake_llm.py
+"""A local OpenAI-compatible chat completions server for offline runs and benchmarks.
+
+    python -m benchmarks.fake_llm --port 8199 --latency 0.4 --jitter 0.2 --failure-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8199/v1 OPENAI_API_KEY=fake uvicorn src.main:app
+
+Answers are computed from the prompt itself: classification requests get the local
+classifier's label, extraction requests get the regex engine's and the gazetteer's
+values for exactly the keys in the request's JSON schema. Each request sleeps for
+`latency` +/- `jitter` seconds, and a `failure_rate` fraction of them fail with
+`failure_status` (429 carries a Retry-After header) before any work is done.
+Requests for `degraded_model` get a wrong value (an unparseable date, a zero total,
+an empty name) in a `degrade_rate` fraction of their answers, to exercise the
+pipeline's escalation from the fast model tier.
+GET /stats reports request, failure, degradation and token counts, and calls per model.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.classifier import classify_pages
+from src.field_extraction import best_fields
+from src.gazetteer import hospital_gazetteer
+from src.schemas import Bill, DischargeSummary, IDCard
+
+COMBINED_PARTS = {"bill": Bill, "discharge_summary": DischargeSummary, "id_card": IDCard}
+CHARS_PER_TOKEN = 4
+
+
+def _document(content: str) -> tuple[Optional[dict], str]:
+    """Splits an extraction request into (schema, document); classification requests have no schema."""
+    if not content.startswith("Schema:\n") or "\n\nDocument:\n" not in content:
+        return None, content
+    schema, document = content[len("Schema:\n"):].split("\n\nDocument:\n", 1)
+    return json.loads(schema), document
+
+
+def _fields(keys, document: str) -> dict:
+    found = best_fields(document)
+    values = {key: found[key].value if key in found else None for key in keys}
+    if "hospital_name" in values:
+        match = hospital_gazetteer.match(document)
+        values["hospital_name"] = match.name if match else None
+    return values
+
+
+def answer(messages: list) -> str:
+    """What a well-behaved model would reply to the pipeline's prompts, from local extraction."""
+    schema, document = _document(messages[-1]["content"] if messages else "")
+    if schema is None:
+        return classify_pages([document]).doc_type
+    keys = list(schema.get("properties", {}))
+    if set(keys) & set(COMBINED_PARTS):
+        reply = {part: _fields(COMBINED_PARTS[part].model_fields, document) for part in keys}
+        if reply.get("id_card") and not reply["id_card"]["policy_id"]:
+            reply["id_card"] = None
+        return json.dumps(reply)
+    return json.dumps(_fields(keys, document))
+
+
+DEGRADED_VALUES = {"admission_date": "N/A", "discharge_date": "unknown", "date_of_service": "N/A",
+                   "total_amount": 0, "patient_name": ""}
+
+
+def degrade(content: str, rng: random.Random) -> str:
+    """`content` with one field (nested documents included) replaced by an implausible value."""
+    if not content.startswith("{"):
+        return content
+    reply = json.loads(content)
+    targets = [(reply, key) for key in reply if key in DEGRADED_VALUES]
+    for part in reply.values():
+        if isinstance(part, dict):
+            targets += [(part, key) for key in part if key in DEGRADED_VALUES]
+    if targets:
+        fields, key = rng.choice(targets)
+        fields[key] = DEGRADED_VALUES[key]
+    return json.dumps(reply)
+
+
+def create_app(latency: float = 0.3, jitter: float = 0.1, failure_rate: float = 0.0,
+               failure_status: int = 429, seed: Optional[int] = None,
+               degraded_model: Optional[str] = None, degrade_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    stats = Counter()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        stats[f"model:{body.get('model')}"] += 1
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+        if rng.random() < failure_rate:
+            stats[f"failed_{failure_status}"] += 1
+            headers = {"retry-after": "1"} if failure_status == 429 else {}
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "fake_llm_error", "code": None}},
+                status_code=failure_status, headers=headers,
+            )
+
+        content = answer(body.get("messages", []))
+        if degraded_model and body.get("model") == degraded_model and rng.random() < degrade_rate:
+            stats["degraded"] += 1
+            content = degrade(content, rng)
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // CHARS_PER_TOKEN
+        completion_tokens = len(content) // CHARS_PER_TOKEN + 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        return {
+            "id": f"chatcmpl-fake-{next(ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--latency", type=float, default=0.3, help="mean seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds around the mean")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests that fail (0-1)")
+    parser.add_argument("--failure-status", type=int, default=429, help="HTTP status of injected failures")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--degraded-model", help="model whose answers are sometimes wrong")
+    parser.add_argument("--degrade-rate", type=float, default=0.0, help="fraction of its answers made wrong (0-1)")
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.failure_rate, args.failure_status, args.seed,
+                     args.degraded_model, args.degrade_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# benchmarks/synthetic_claims.py
+"""Synthetic claim PDFs: bills, discharge summaries and consolidated claims, digital or scanned.
+
+    python -m benchmarks.synthetic_claims --out samples/ --count 20
+    python -m benchmarks.synthetic_claims --out samples/ --count 5 --kind consolidated --scanned 1.0
+
+Digital documents have a text layer. Scanned ones are the same pages rendered to a
+grayscale image and embedded without any text, so the pipeline has to OCR them.
+Every claim keeps the values printed on it, for checking what the pipeline extracted.
+"""
+import argparse
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import pymupdf
+
+HOSPITALS = ["Max Super Speciality Hospital, Saket", "Sir Ganga Ram Hospital", "Apollo Hospitals", "Fortis Hospital",
+             "Medanta The Medicity", "Manipal Hospital"]
+FIRST = ["Rajesh", "Mary", "Anita", "Vikram", "Farah", "Suresh", "Priya", "Amit", "Neha", "Arjun"]
+LAST = ["Kumar", "Philo", "Sharma", "Singh", "Khan", "Patel", "Reddy", "Iyer", "Gupta", "Nair"]
+DIAGNOSES = ["TYPHOID FEVER", "DENGUE FEVER", "ACUTE APPENDICITIS", "COMMUNITY ACQUIRED PNEUMONIA",
+             "ACUTE GASTROENTERITIS"]
+CHARGES = ["Room Charges", "Nursing Charges", "Pharmacy Charges", "Investigation Charges", "Consultation Charges",
+           "Consumables", "Procedure Charges"]
+
+KINDS = ("bill", "discharge_summary", "consolidated")
+SCAN_DPI = 150
+LINE_HEIGHT = 16
+MARGIN = 50
+
+
+@dataclass
+class SyntheticClaim:
+    filename: str
+    kind: str
+    scanned: bool
+    fields: Dict[str, object]
+    pdf: bytes = field(repr=False)
+
+
+def _bill_lines(f: dict, rng: random.Random) -> List[str]:
+    lines = [f["hospital_name"], "IP FINAL BILL", "",
+             f"Bill No: {rng.randint(100000, 999999)}        Bill Date: {f['bill_date']}",
+             f"Patient Name: {f['patient_name']}", f"Policy Number: {f['policy_id']}", "",
+             "Particulars                                  Amount"]
+    for name, amount in f["charges"]:
+        lines.append(f"{name:<40} {amount:>12,.2f}")
+    lines += ["", f"{'Grand Total':<40} {f['total_amount']:>12,.2f}", f"{'Amount Paid':<40} {f['total_amount']:>12,.2f}"]
+    return lines
+
+
+def _summary_lines(f: dict, rng: random.Random) -> List[str]:
+    return [
+        f["hospital_name"], "DISCHARGE SUMMARY", "",
+        f"Patient Name: {f['patient_name']}        UHID: {f['policy_id']}",
+        f"Date of Admission: {f['admission']}        Discharge Date: {f['discharge']}", "",
+        "FINAL DIAGNOSIS:", f["diagnosis"], "",
+        "Chief Complaints: fever with chills for 5 days.",
+        "History of Present Illness: patient presented with high grade fever and body ache.",
+        f"Course in Hospital: treated with IV antibiotics and fluids for {rng.randint(2, 6)} days.",
+        "Condition at Discharge: stable.", "Advice on Discharge: review in OPD after 1 week.",
+    ]
+
+
+def _lab_lines(f: dict, rng: random.Random) -> List[str]:
+    return [
+        f["hospital_name"], "LABORATORY REPORT", f"Patient Name: {f['patient_name']}", "",
+        f"Haemoglobin        {rng.uniform(10, 15):.1f} g/dL",
+        f"WBC                {rng.randint(4000, 15000)} /cumm",
+        f"Platelets          {rng.uniform(1, 3):.1f} lakh/cumm",
+        f"CRP                {rng.randint(2, 60)} mg/L",
+    ]
+
+
+def claim_fields(rng: random.Random) -> dict:
+    """Values for one claim, as printed (DD/MM/YYYY dates) and as the pipeline should extract them."""
+    admitted = date(2024, 1, 1) + timedelta(days=rng.randrange(600))
+    discharged = admitted + timedelta(days=rng.randint(1, 10))
+    charges = [(name, rng.randint(5, 400) * 100.0) for name in rng.sample(CHARGES, rng.randint(3, len(CHARGES)))]
+    return {
+        "hospital_name": rng.choice(HOSPITALS),
+        "patient_name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+        "policy_id": f"POL{rng.randint(10 ** 8, 10 ** 9 - 1)}",
+        "diagnosis": rng.choice(DIAGNOSES),
+        "admission": admitted.strftime("%d/%m/%Y"),
+        "discharge": discharged.strftime("%d/%m/%Y"),
+        "bill_date": discharged.strftime("%d/%m/%Y"),
+        "charges": charges,
+        "total_amount": sum(amount for _, amount in charges),
+    }
+
+
+def _render(pages: List[List[str]]) -> bytes:
+    doc = pymupdf.open()
+    for lines in pages:
+        page = doc.new_page()
+        for i, line in enumerate(lines):
+            page.insert_text((MARGIN, MARGIN + 20 + i * LINE_HEIGHT), line, fontname="cour", fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def scan(pdf: bytes, dpi: int = SCAN_DPI) -> bytes:
+    """The same pages as grayscale images with no text layer, like a scanner would produce."""
+    scanned = pymupdf.open()
+    with pymupdf.open(stream=pdf, filetype="pdf") as doc:
+        for page in doc:
+            pix = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY)
+            target = scanned.new_page(width=page.rect.width, height=page.rect.height)
+            target.insert_image(target.rect, stream=pix.tobytes("png"))
+    data = scanned.tobytes(deflate=True)
+    scanned.close()
+    return data
+
+
+def make_claim(index: int, kind: str, scanned: bool, rng: random.Random) -> SyntheticClaim:
+    f = claim_fields(rng)
+    if kind == "bill":
+        pages = [_bill_lines(f, rng)]
+    elif kind == "discharge_summary":
+        pages = [_summary_lines(f, rng), _lab_lines(f, rng)]
+    else:
+        pages = [_bill_lines(f, rng), _summary_lines(f, rng)] + [_lab_lines(f, rng)] * rng.randint(0, 2)
+    pdf = _render(pages)
+    if scanned:
+        pdf = scan(pdf)
+    name = f"{index:04d}_{kind}{'_scanned' if scanned else ''}.pdf"
+    return SyntheticClaim(name, kind, scanned, f, pdf)
+
+
+def resubmission(claim: SyntheticClaim, index: int) -> SyntheticClaim:
+    """The same claim sent again, as hospitals do: a consolidated claim's discharge summary
+    page on its own, any other document as an identical copy."""
+    pdf = claim.pdf
+    kind = claim.kind
+    if claim.kind == "consolidated":
+        with pymupdf.open(stream=claim.pdf, filetype="pdf") as doc, pymupdf.open() as single:
+            single.insert_pdf(doc, from_page=1, to_page=1)
+            pdf = single.tobytes(deflate=True)
+        kind = "discharge_summary"
+    name = f"{index:04d}_{kind}{'_scanned' if claim.scanned else ''}_resubmitted.pdf"
+    return SyntheticClaim(name, kind, claim.scanned, claim.fields, pdf)
+
+
+def generate(
+    count: int, kinds: Optional[List[str]] = None, scanned_ratio: float = 0.0, seed: int = 7
+) -> List[SyntheticClaim]:
+    """`count` claims cycling through `kinds`; about `scanned_ratio` of them are scanned."""
+    rng = random.Random(seed)
+    kinds = kinds or list(KINDS)
+    return [make_claim(i, kinds[i % len(kinds)], rng.random() < scanned_ratio, rng) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="directory to write the PDFs to")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--kind", choices=KINDS, action="append", help="document kinds (default: all, cycled)")
+    parser.add_argument("--scanned", type=float, default=0.0, help="fraction of scanned documents (0-1)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for claim in generate(args.count, args.kind, args.scanned, args.seed):
+        with open(os.path.join(args.out, claim.filename), "wb") as f:
+            f.write(claim.pdf)
+        print(f"{claim.filename:<40} {len(claim.pdf) / 1024:>8.1f} KB  {claim.fields['patient_name']}")
+
+
+if __name__ == "__main__":
+    main()
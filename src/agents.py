@@ -1,19 +1,27 @@
-import os
 import json
-import re
-from datetime import datetime
-from typing import List, Type, Optional
-from pydantic import BaseModel, ValidationError
+import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple, Type, Optional
+from pydantic import BaseModel, ValidationError, create_model
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+
+# Load .env before the modules below read their settings.
+load_dotenv()
 
 from . import schemas
+from .cache import content_hash, make_key, llm_cache
+from .field_extraction import FIELD_CONFIDENCE_THRESHOLD, best_fields, scan_fields
+from .gazetteer import hospital_gazetteer
+from .llm_client import llm_client
+from .metrics import FALLBACKS, ROUTING
+from .routing import OPENAI_FAST_MODEL, OPENAI_MODEL, implausible_fields, tiered
+from .ingest import PDFSource
+from .utils import ocr_header_text
+from .validation import validate_claims
 
-from pdf2image import convert_from_bytes
-import pytesseract
+logger = logging.getLogger(__name__)
 
-load_dotenv()
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=90.0)
+DOCUMENT_TYPES = ['bill', 'discharge_summary', 'id_card', 'consolidated_claim']
 
 # --- PROMPTS ---
 
@@ -59,124 +67,131 @@ Rules:
 """
 
 
+COMBINED_EXTRACTION_PROMPT = """
+You are a structured data extractor for consolidated medical claim PDFs, which may contain a hospital bill, a discharge summary and an insurance ID card in one document. Extract all of them in one pass.
+
+Return a valid JSON object with these exact keys:
+- "bill": object with "patient_name", "hospital_name", "total_amount", "date_of_service", "policy_id" (each value or null)
+- "discharge_summary": object with "patient_name", "hospital_name", "diagnosis", "admission_date", "discharge_date" (each value or null)
+- "id_card": object with "patient_name", "policy_id", or null if the document has no insurance ID card
+
+Rules:
+1. DO NOT include any explanation, headers, or extra text — ONLY return the JSON object.
+2. Use `null` if a field is not present or uncertain.
+3. All dates must be in the format "YYYY-MM-DD".
+4. `total_amount` must be numeric (e.g., 447051 or 12500.50). Do not include currency symbols or commas.
+5. For `date_of_service`, prefer "Bill Date", "Date of Service", or "Invoice Date".
+6. Look for policy-related identifiers like: "Policy No", "Policy Number", "MaxID", "UHID", "CCN", "Claim Number", or "Episode ID" for `policy_id`. Use the most relevant one.
+7. For `hospital_name`, extract the clean name of the hospital, usually at the top of the first page. Ignore surrounding IDs, GST numbers, or unrelated organization info.
+8. For diagnosis, prefer text under headings like "DIAGNOSIS", "FINAL DIAGNOSIS" and cleanly merge up to 3 lines.
+"""
+
+
+# Appended to a targeted prompt when only some of its fields are still needed.
+PARTIAL_EXTRACTION_NOTE = """
+Only these keys are still needed; return a JSON object with exactly these keys: {keys}.
+"""
+
+DOCUMENT_TYPE_MODELS = {"bill": schemas.Bill, "discharge_summary": schemas.DischargeSummary, "id_card": schemas.IDCard}
+
+
 # --- CLASSIFICATION ---
 
-async def classify_document(text: str, filename: str) -> str:
+async def classify_document(text: str, filename: str, context: Optional[str] = None) -> str:
+    """Classifies with the LLM. `context` is the document excerpt to send (default: the first 8000 characters).
+
+    Falls back to 'bill' when no tier returns a known label; LLM errors propagate.
+    """
     prompt = """
 You are a document classification system for medical claim PDFs.
 Return one of: 'bill', 'discharge_summary', 'id_card', 'consolidated_claim'.
 Prefer 'consolidated_claim' if both financial and clinical info are present.
 """
-    try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": f"Filename: {filename}\n\n{text[:8000]}"}
-            ],
-            temperature=0
-        )
-        result_content = response.choices[0].message.content
-        if result_content is not None:
+    user_content = f"Filename: {filename}\n\n{context if context is not None else text[:8000]}"
+    # The fast tier's answer stands unless it isn't one of the labels.
+    for model_name in _model_tiers():
+        cache_key = make_key("classify", content_hash(user_content), prompt, model_name)
+        result = llm_cache.get(cache_key)
+        if result is None:
+            response = await llm_client.chat(
+                purpose="classify",
+                model=model_name,
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": user_content}
+                ],
+                temperature=0
+            )
+            result_content = response.choices[0].message.content
+            if result_content is None:
+                logger.warning("classify_document: No content returned from %s.", model_name)
+                continue
             result = result_content.strip().lower()
-            return result if result in ['bill', 'discharge_summary', 'id_card', 'consolidated_claim'] else 'bill'
-        else:
-            print("[WARN] classify_document: No content returned from OpenAI.")
-            return 'bill'
-    except Exception as e:
-        print(f"[ERROR] classify_document: {e}")
-        return 'bill'
+            if result not in DOCUMENT_TYPES:
+                logger.warning("classify_document: %s returned unknown type %r", model_name, result)
+                continue
+            llm_cache.set(cache_key, result)
+        _record_route("classify", model_name)
+        return result
+    return 'bill'
 
 # --- FALLBACKS ---
 
-import difflib  # add at the top with your imports
+def hospital_from_text(text: str) -> Optional[str]:
+    """Hospital named in `text`, by exact alias match against the gazetteer."""
+    match = hospital_gazetteer.match(text)
+    return match.name if match else None
 
-def fallback_hospital_name(text: str, file_bytes: Optional[bytes]) -> Optional[str]:
-    known_keywords = {
-        "max": "Max Healthcare",
-        "max healthcare": "Max Healthcare",
-        "sir ganga ram": "Sir Ganga Ram Hospital",
-        "ganga ram": "Sir Ganga Ram Hospital",
-        "apollo": "Apollo Hospital",
-        "fortis": "Fortis Hospital",
-        "aiims": "AIIMS"
-    }
 
+async def fallback_hospital_name(text: str, file_bytes: Optional[PDFSource]) -> Optional[str]:
     # Text-based match
-    for key, value in known_keywords.items():
-        if key in text.lower():
-            return value
+    hospital = hospital_from_text(text)
+    if hospital:
+        return hospital
 
     if file_bytes:
         try:
-            image = convert_from_bytes(
-                file_bytes,
-                first_page=1,
-                last_page=1,
-                poppler_path=r"C:\poppler\poppler-24.08.0\Library\bin"
-            )[0]
-            width, height = image.size
-            cropped = image.crop((0, 0, width, int(height * 0.15)))  # top 15%
-            ocr_text = pytesseract.image_to_string(cropped).lower()
-
-            print("[DEBUG] OCR top-crop text:\n", ocr_text)
-
-            for key, value in known_keywords.items():
-                if key in ocr_text:
-                    return value
+            # top 15% of page 1, reused from the text-extraction OCR when available
+            ocr_text = (await ocr_header_text(file_bytes)).lower()
+
+            logger.debug("OCR top-crop text:\n%s", ocr_text)
+
+            # OCR misreads characters, so allow fuzzy matches here
+            match = hospital_gazetteer.match(ocr_text, fuzzy=True)
+            if match:
+                logger.info("Hospital matched from OCR header: %s (score %.2f)", match.name, match.score)
+                return match.name
 
             # EXTRA: If 'healthcare' + 'maxid' is present, guess Max Healthcare
             if "healthcare" in ocr_text and "maxid" in text.lower():
-                print("[INFO] Detected 'healthcare' and MaxID, assuming Max Healthcare")
+                logger.info("Detected 'healthcare' and MaxID, assuming Max Healthcare")
                 return "Max Healthcare"
 
         except Exception as e:
-            print(f"[WARN] OCR fallback failed: {e}")
+            logger.warning("OCR fallback failed: %s", e)
 
     return None
 
 def extract_policy_id(text: str) -> Optional[str]:
-    # Match MaxID (already working)
-    match = re.search(r"MaxID\s*[:\-]?\s*([A-Z0-9./\-]+)", text, re.IGNORECASE)
-    if match:
-        print("[INFO] Policy ID extracted from MaxID")
-        return match.group(1).strip()
-
-    # New: Match 'Patient ID  :  VSLI.633928'
-    match = re.search(r"Patient\s*ID\s*[:\-]?\s*([A-Z0-9./\-]+)", text, re.IGNORECASE)
-    if match:
-        print("[INFO] Policy ID extracted from Patient ID")
-        return match.group(1).strip()
-
-    # Existing fallback options
-    match = re.search(
-        r"(Episode\s*ID|UHID|Policy\s*(No|Number)|Claim\s*Number|CCN)[\s:]*([A-Z0-9./\-]+)",
-        text, re.IGNORECASE
-    )
-    if match:
-        print(f"[INFO] Policy ID extracted from label: {match.group(1)}")
-        return match.group(3).strip()
-
-    print("[WARN] No policy ID matched.")
+    candidates = scan_fields(text).get("policy_id")
+    if candidates:
+        logger.info("Policy ID extracted from label: %s", candidates[0].label)
+        return candidates[0].value
+    logger.warning("No policy ID matched.")
     return None
 
 
-
 def extract_date(text: str, labels: List[str]) -> Optional[str]:
-    for label in labels:
-        pattern = rf"{label}\s*[:\-]?\s*(\d{{1,2}}[/-]\d{{1,2}}[/-]\d{{2,4}})"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return normalize_date(match.group(1))
-    return None
+    """First date found after any of `labels`, in label order, as YYYY-MM-DD."""
+    wanted = {label.lower(): rank for rank, label in enumerate(labels)}
+    found = [
+        c for candidates in scan_fields(text).values() for c in candidates
+        if isinstance(c.value, str) and c.label.lower() in wanted and c.field.endswith("date")
+    ]
+    if not found:
+        return None
+    return min(found, key=lambda c: (wanted[c.label.lower()], c.position)).value
 
-def normalize_date(date_str: str) -> Optional[str]:
-    for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%Y/%m/%d"):
-        try:
-            return datetime.strptime(date_str.strip(), fmt).strftime("%Y-%m-%d")
-        except:
-            continue
-    return None
 
 # --- EXTRACTION ---
 
@@ -184,84 +199,300 @@ async def targeted_extraction_agent(
     text: str,
     model: Type[BaseModel],
     doc_type: str,
-    file_bytes: Optional[bytes] = None
+    file_bytes: Optional[PDFSource] = None,
+    context: Optional[str] = None,
+    sources: Optional[Dict[str, str]] = None
 ) -> Optional[BaseModel]:
+    """Extracts one document type. `context` is the excerpt sent to the LLM (default: the
+    first 16000 characters); regex fallbacks always search the full `text`.
+
+    `model` may be a partial_model() of the document type's schema, in which case only
+    its fields are requested. If `sources` is given, it is filled with where each
+    non-null field came from ("llm", "regex:<label>" or "fallback"). Returns None when
+    the model's answer is missing or doesn't fit the schema; LLM errors propagate, so
+    the file is reported as failed rather than as having no documents.
+    """
     prompt = BILL_EXTRACTION_PROMPT if doc_type == "bill" else DISCHARGE_SUMMARY_EXTRACTION_PROMPT
+    full_model = DOCUMENT_TYPE_MODELS.get(doc_type, model)
+    document = context if context is not None else text[:16000]
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4-turbo",
+        data = await _extract_routed(prompt, model, full_model, document, "extract")
+        if data is None:
+            logger.error("targeted_extraction_agent: No content returned from OpenAI.")
+            return None
+
+        await apply_fallbacks([(data, model)], text, file_bytes, [sources] if sources is not None else None)
+        return model(**data)
+
+    except (json.JSONDecodeError, ValidationError) as e:
+        logger.error("targeted_extraction_agent: %s", e)
+        return None
+
+
+async def combined_extraction_agent(
+    text: str,
+    file_bytes: Optional[PDFSource] = None,
+    context: Optional[str] = None,
+    sources: Optional[List[Dict[str, str]]] = None
+) -> List[BaseModel]:
+    """Extracts Bill, DischargeSummary and IDCard from one document with a single LLM call.
+
+    Returns the bill and discharge summary (always, like two targeted calls would) and
+    the ID card only when the model found one. Fallbacks run at most once per field.
+    `context` and errors work as in targeted_extraction_agent; if `sources` is given, one
+    field source dict per returned document is appended to it.
+    """
+    document = context if context is not None else text[:16000]
+    try:
+        data = await _extract_routed(
+            COMBINED_EXTRACTION_PROMPT, schemas.CombinedClaimExtraction, schemas.CombinedClaimExtraction,
+            document, "extract_combined")
+        if data is None:
+            logger.error("combined_extraction_agent: No content returned from OpenAI.")
+            return []
+
+        # A part that isn't a JSON object counts as not found.
+        parts = {key: value for key, value in data.items() if isinstance(value, dict)}
+        records = [
+            (dict(parts.get("bill") or {}), schemas.Bill),
+            (dict(parts.get("discharge_summary") or {}), schemas.DischargeSummary),
+        ]
+        if parts.get("id_card"):
+            records.append((dict(parts["id_card"]), schemas.IDCard))
+
+        record_sources = [{} for _ in records]
+        await apply_fallbacks(records, text, file_bytes, record_sources)
+        if sources is not None:
+            sources.extend(record_sources)
+        return [model(**fields) for fields, model in records]
+
+    except (json.JSONDecodeError, ValidationError) as e:
+        logger.error("combined_extraction_agent: %s", e)
+        return []
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """`model` reduced to `fields`, all optional; the schema sent when only those are missing."""
+    return create_model(
+        f"{model.__name__}Partial",
+        **{field: (model.model_fields[field].annotation, None) for field in fields}
+    )
+
+
+async def regex_first_extraction_agent(
+    text: str,
+    model: Type[BaseModel],
+    doc_type: str,
+    file_bytes: Optional[PDFSource] = None,
+    context: Optional[str] = None,
+    sources: Optional[Dict[str, str]] = None
+) -> Optional[BaseModel]:
+    """Extracts one document type locally first and asks the LLM only for the rest.
+
+    Fields found by the regex engine with confidence >= FIELD_CONFIDENCE_THRESHOLD (and
+    hospital names matched exactly in the gazetteer) are kept; the remaining fields go to
+    targeted_extraction_agent with a partial_model() schema. No LLM call is made when
+    every field is resolved locally. `sources` works as in targeted_extraction_agent.
+    """
+    local = best_fields(text)
+    data, origin = {}, {}
+    for field in model.model_fields:
+        candidate = local.get(field)
+        if candidate and candidate.confidence >= FIELD_CONFIDENCE_THRESHOLD:
+            data[field] = candidate.value
+            origin[field] = f"regex:{candidate.label}"
+    if "hospital_name" in model.model_fields:
+        hospital = hospital_from_text(text)
+        if hospital:
+            data["hospital_name"] = hospital
+            origin["hospital_name"] = "gazetteer"
+
+    missing = tuple(field for field in model.model_fields if field not in data)
+    if missing:
+        logger.info("%s: %d field(s) found locally, asking LLM for %s", doc_type, len(data), ", ".join(missing))
+        llm_origin = {}
+        partial = await targeted_extraction_agent(
+            text, partial_model(model, missing), doc_type, file_bytes, context, llm_origin)
+        if partial is not None:
+            for field in missing:
+                value = getattr(partial, field)
+                if value is not None:
+                    data[field] = value
+                    origin[field] = llm_origin.get(field, "llm")
+    else:
+        logger.info("%s: all fields found locally, skipping LLM", doc_type)
+
+    if sources is not None:
+        sources.update(origin)
+    return model(**data)
+
+
+def _model_tiers() -> List[str]:
+    """Models to try in order: the fast tier first when routing is on."""
+    return [OPENAI_FAST_MODEL, OPENAI_MODEL] if tiered() else [OPENAI_MODEL]
+
+
+def _record_route(purpose: str, model_name: str, fields: bool = False) -> None:
+    """Counts where a call was settled: fast, escalated (whole document), escalated_fields, or large."""
+    if not tiered():
+        ROUTING.inc(purpose, "large")
+    elif model_name == OPENAI_FAST_MODEL:
+        ROUTING.inc(purpose, "fast")
+    else:
+        ROUTING.inc(purpose, "escalated_fields" if fields else "escalated")
+
+
+def _with_partial_note(prompt: str, model: Type[BaseModel], full_model: Type[BaseModel]) -> str:
+    if set(model.model_fields) < set(full_model.model_fields):
+        return prompt + PARTIAL_EXTRACTION_NOTE.format(keys=", ".join(f'"{f}"' for f in model.model_fields))
+    return prompt
+
+
+async def _extract_routed(
+    prompt: str, model: Type[BaseModel], full_model: Type[BaseModel], document: str, purpose: str
+) -> Optional[dict]:
+    """Extracts `model`'s fields with the fast tier, escalating to OPENAI_MODEL what fails.
+
+    An answer that passes routing.implausible_fields() is returned as is. When only some
+    fields fail, just those are asked of the large model (a partial_model() of
+    `full_model`) and merged in; when nothing usable came back, the whole document is
+    escalated. `model` may itself be a partial of `full_model`.
+    """
+    schema = json.dumps(model.model_json_schema())
+    prompt_for_model = _with_partial_note(prompt, model, full_model)
+    if not tiered():
+        data = await _extract_json(prompt_for_model, schema, document, purpose, OPENAI_MODEL)
+        _record_route(purpose, OPENAI_MODEL)
+        return data
+
+    data = await _extract_json(prompt_for_model, schema, document, purpose, OPENAI_FAST_MODEL)
+    failing = implausible_fields(data, model)
+    if not failing:
+        _record_route(purpose, OPENAI_FAST_MODEL)
+        return data
+    if data is None or len(failing) == len(model.model_fields):
+        logger.info("%s: escalating to %s (fast tier failed every field)", purpose, OPENAI_MODEL)
+        _record_route(purpose, OPENAI_MODEL)
+        return await _extract_json(prompt_for_model, schema, document, purpose, OPENAI_MODEL)
+
+    logger.info("%s: escalating %s to %s", purpose, ", ".join(failing), OPENAI_MODEL)
+    _record_route(purpose, OPENAI_MODEL, fields=True)
+    escalated_model = partial_model(full_model, tuple(failing))
+    escalated = await _extract_json(
+        _with_partial_note(prompt, escalated_model, full_model), json.dumps(escalated_model.model_json_schema()),
+        document, purpose, OPENAI_MODEL)
+    for field in failing:
+        # A value the fast tier got wrong is dropped even if the large model has nothing better.
+        data[field] = (escalated or {}).get(field)
+    return data
+
+
+async def _extract_json(prompt: str, schema: str, document: str, purpose: str, model_name: str) -> Optional[dict]:
+    """One JSON-mode completion, served from the LLM cache when possible.
+
+    Returns a fresh dict (callers may mutate it) or None if the model returned nothing
+    or something other than a JSON object. Raises json.JSONDecodeError on invalid JSON.
+    """
+    cache_key = make_key(purpose, content_hash(document), schema, prompt, model_name)
+    data = llm_cache.get(cache_key)
+    if data is None:
+        response = await llm_client.chat(
+            purpose=purpose,
+            model=model_name,
             messages=[
                 {"role": "system", "content": prompt},
-                {"role": "user", "content": f"Schema:\n{json.dumps(model.model_json_schema())}\n\nDocument:\n{text[:16000]}"}
+                {"role": "user", "content": f"Schema:\n{schema}\n\nDocument:\n{document}"}
             ],
             response_format={"type": "json_object"},
             temperature=0,
         )
         content = response.choices[0].message.content
         if content is None:
-            print("[ERROR] targeted_extraction_agent: No content returned from OpenAI.")
             return None
         data = json.loads(content)
+        if not isinstance(data, dict):
+            return None
+        llm_cache.set(cache_key, data)
+    # Fallbacks mutate the dict; keep the cached copy pristine.
+    return dict(data)
+
 
-        if not data.get("hospital_name"):
-            hospital = fallback_hospital_name(text, file_bytes)
+async def apply_fallbacks(
+    records: List[Tuple[dict, Type[BaseModel]]],
+    text: str,
+    file_bytes: Optional[PDFSource],
+    sources: Optional[List[Dict[str, str]]] = None
+) -> None:
+    """Fills fields the LLM left empty from regex/OCR fallbacks, in place.
+
+    Only fields that exist on each record's model are filled, and each fallback
+    runs at most once even when several records need the same field. The regex
+    fields all come from one scan of `text`. `sources`, parallel to `records`,
+    receives each non-null field's origin.
+    """
+    results = {}
+    labels = {}
+    scanned = None
+
+    async def fallback(field: str):
+        nonlocal scanned
+        if field not in results:
+            if field == "hospital_name":
+                results[field] = await fallback_hospital_name(text, file_bytes)
+            else:
+                if scanned is None:
+                    scanned = scan_fields(text)
+                candidates = scanned.get(field)
+                results[field] = candidates[0].value if candidates else None
+                if candidates:
+                    labels[field] = candidates[0].label
+                    logger.info("%s filled by regex fallback from '%s'", field, candidates[0].label)
+            FALLBACKS.inc(field, "hit" if results[field] else "miss")
+        return results[field]
+
+    for i, (data, model) in enumerate(records):
+        fields = model.model_fields
+        filled = set()
+        if "hospital_name" in fields and not data.get("hospital_name"):
+            hospital = await fallback("hospital_name")
             if hospital:
                 data["hospital_name"] = hospital
-
-        if not data.get("policy_id") or data["policy_id"] == "0":
-            data["policy_id"] = extract_policy_id(text)
-
-        if not data.get("discharge_date"):
-            data["discharge_date"] = extract_date(text, ["Discharge Date", "Discharged On"])
-
-        if not data.get("admission_date"):
-            data["admission_date"] = extract_date(text, ["Date of Admission", "Admission Date"])
-
-        if not data.get("total_amount"):
-            data["total_amount"] = extract_total_amount(text)
-
-        if doc_type == "discharge_summary" and not data.get("diagnosis"):
-            data["diagnosis"] = extract_diagnosis(text)
-
-        return model(**data)
-
-    except Exception as e:
-        print(f"[ERROR] targeted_extraction_agent: {e}")
-        return None
+                filled.add("hospital_name")
+        if "policy_id" in fields and (not data.get("policy_id") or data["policy_id"] == "0"):
+            data["policy_id"] = await fallback("policy_id")
+            filled.add("policy_id")
+        for field in ("discharge_date", "admission_date", "total_amount", "diagnosis"):
+            if field in fields and not data.get(field):
+                data[field] = await fallback(field)
+                filled.add(field)
+        if sources is not None:
+            for field in fields:
+                if data.get(field) is None:
+                    continue
+                if field not in filled:
+                    sources[i][field] = "llm"
+                else:
+                    sources[i][field] = f"regex:{labels[field]}" if field in labels else "fallback"
 
 # --- VALIDATION ---
 
 async def validation_agent(data: schemas.ConsolidatedClaimData) -> schemas.Validation:
-    missing = [k for k, v in data.model_dump().items() if v is None]
-    discrepancies = []
-    try:
-        if data.admission_date and data.discharge_date and data.date_of_service:
-            if not (data.admission_date <= data.date_of_service <= data.discharge_date):
-                discrepancies.append("Date of service outside admission/discharge range.")
-    except:
-        discrepancies.append("Date comparison failed.")
-    return schemas.Validation(missing_fields=missing, discrepancies=discrepancies)
-
-# --- Helper Extraction Functions (added to fix linter errors) ---
+    """Validates a single claim; batches go through validate_claims in one pass."""
+    return validate_claims([data])[0]
+
+# --- Helper Extraction Functions ---
+# Thin wrappers over the single-pass engine in field_extraction.py.
 def extract_total_amount(text: str) -> Optional[float]:
-    """Extracts the largest number in the text as a fallback for total_amount."""
-    amounts = re.findall(r"[0-9]+(?:\\.[0-9]{1,2})?", text.replace(",", ""))
-    if amounts:
-        try:
-            return float(max(amounts, key=lambda x: float(x)))
-        except Exception as e:
-            print(f"[WARN] extract_total_amount: {e}")
-    return None
+    """Labelled total (Grand Total, Net Payable, ...), else the largest number in the text."""
+    candidates = scan_fields(text).get("total_amount")
+    return candidates[0].value if candidates else None
 
 def extract_diagnosis(text: str) -> Optional[str]:
-    """Fallback: Try to extract diagnosis section from text."""
-    print("[DEBUG] Running fallback extract_diagnosis")
-    # Look for headings like DIAGNOSIS or FINAL DIAGNOSIS
-    match = re.search(r"(?:DIAGNOSIS|FINAL DIAGNOSIS)[:\-\s]*([\s\S]{0,200})", text, re.IGNORECASE)
-    if match:
-        diagnosis = match.group(1).strip().split("\n")[0:3]
-        diagnosis_str = "; ".join([d.strip() for d in diagnosis if d.strip()])
-        print("[INFO] Diagnosis extracted via fuzzy match.")
-        return diagnosis_str if diagnosis_str else None
-    print("[WARN] Diagnosis section not found in fallback.")
+    """Fallback: first lines under a FINAL DIAGNOSIS / DIAGNOSIS heading."""
+    candidates = scan_fields(text).get("diagnosis")
+    if candidates:
+        logger.info("Diagnosis extracted via fuzzy match.")
+        return candidates[0].value
+    logger.warning("Diagnosis section not found in fallback.")
     return None
@@ -0,0 +1,230 @@
+# src/cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, Union
+
+from src.metrics import CACHE_EVICTIONS, CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MEMORY_MB = int(os.getenv("CACHE_MEMORY_MB", "64"))
+CACHE_DISK_MB = int(os.getenv("CACHE_DISK_MB", "1024"))
+
+
+def content_hash(data: Union[bytes, str]) -> str:
+    """SHA-256 hex digest of raw bytes or UTF-8 text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(*parts: str) -> str:
+    """Builds a fixed-length key from several components (text hash, schema, prompt, model...)."""
+    return content_hash("\x1f".join(parts))
+
+
+class MemoryLRU:
+    """In-process LRU bounded by the total size of the JSON-encoded values."""
+
+    def __init__(self, name: str, max_bytes: int, ttl_seconds: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size = 0
+        self._items: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, size, created_at = item
+            if time.time() - created_at > self.ttl_seconds:
+                del self._items[key]
+                self.size -= size
+                CACHE_EVICTIONS.inc(self.name, "memory", "expired")
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, size: int, created_at: Optional[float] = None) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._items[key] = (value, size, created_at or time.time())
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size, _) = self._items.popitem(last=False)
+                self.size -= evicted_size
+                CACHE_EVICTIONS.inc(self.name, "memory", "size")
+
+
+class SQLiteStore:
+    """On-disk tier. Entries are evicted least-recently-used first once the table exceeds max_bytes.
+
+    The table's total size is summed once when the database is opened and kept up to
+    date by this store's own writes; entries written by other processes sharing the
+    file are counted from the next open.
+    """
+
+    def __init__(self, path: str, table: str, max_bytes: int, ttl_seconds: int):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        """Opens the database on first use so importing the module has no side effects."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table}(accessed_at)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_created ON {self.table}(created_at)")
+            self.size = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._db().execute(
+                f"SELECT value, created_at, size FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._db().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.size -= row[2]
+                CACHE_EVICTIONS.inc(self.table, "disk", "expired")
+                return None
+            self._db().execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0], row[1]
+
+    def set(self, key: str, encoded: str) -> None:
+        now = time.time()
+        size = len(encoded)
+        with self._lock:
+            db = self._db()
+            old = db.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, size, now, now),
+            )
+            self.size += size - (old[0] if old else 0)
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        db = self._db()
+        # Only expired rows are read (via the created_at index); usually there are none.
+        expired = db.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table} WHERE created_at < ?",
+            (now - self.ttl_seconds,),
+        ).fetchone()
+        if expired[0]:
+            db.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.size -= expired[1]
+            CACHE_EVICTIONS.inc(self.table, "disk", "expired", amount=expired[0])
+        if self.size <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in db.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC"):
+            if self.size <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self.size -= size
+        else:
+            # Every row is going; whatever is left of the total was written elsewhere.
+            self.size = 0
+        db.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+        CACHE_EVICTIONS.inc(self.table, "disk", "size", amount=len(doomed))
+
+
+class TwoTierCache:
+    """Memory LRU in front of a SQLite store. Values must be JSON-serialisable."""
+
+    def __init__(self, name: str, memory_max_bytes: int, disk_max_bytes: int, ttl_seconds: int,
+                 disk_path: Optional[str] = None):
+        self.name = name
+        self.memory = MemoryLRU(name, memory_max_bytes, ttl_seconds)
+        self.disk = SQLiteStore(disk_path, name, disk_max_bytes, ttl_seconds) if disk_path else None
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            CACHE_LOOKUPS.inc(self.name, "memory_hit")
+            return value
+        if self.disk is not None:
+            try:
+                row = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning("%s cache disk read failed: %s", self.name, e)
+                row = None
+            if row is not None:
+                encoded, created_at = row
+                value = json.loads(encoded)
+                self.memory.set(key, value, len(encoded), created_at)
+                CACHE_LOOKUPS.inc(self.name, "disk_hit")
+                return value
+        CACHE_LOOKUPS.inc(self.name, "miss")
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        encoded = json.dumps(value)
+        self.memory.set(key, value, len(encoded))
+        if self.disk is not None:
+            try:
+                self.disk.set(key, encoded)
+            except sqlite3.Error as e:
+                logger.warning("%s cache disk write failed: %s", self.name, e)
+
+
+class _DisabledCache:
+    name = "disabled"
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+def _build(name: str):
+    if not CACHE_ENABLED:
+        return _DisabledCache()
+    return TwoTierCache(
+        name,
+        memory_max_bytes=CACHE_MEMORY_MB * 1024 * 1024 // 2,
+        disk_max_bytes=CACHE_DISK_MB * 1024 * 1024 // 2,
+        ttl_seconds=CACHE_TTL_SECONDS,
+        disk_path=os.path.join(CACHE_DIR, "claim_cache.sqlite3"),
+    )
+
+
+# Extracted page text keyed by file hash, and LLM responses keyed by
+# text hash + schema + prompt + model. Lookups and evictions are counted in /metrics.
+text_cache = _build("text_cache")
+llm_cache = _build("llm_cache")
@@ -0,0 +1,137 @@
+# src/checkpoints.py
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.cache import make_key
+from src.ingest import PDFSource, source_hash
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(".checkpoints", "checkpoints.sqlite3"))
+# Checkpoints of batches that never completed are dropped after this long.
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))
+
+# Per-file stages, in pipeline order.
+TEXT = "text"            # text_by_page
+DOC_TYPE = "doc_type"    # the LLM's classification, when the local classifier was unsure
+DOCUMENTS = "documents"  # [{"document_type", "data", "field_sources"}], as in "file_extracted" events
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    batch_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (batch_id, idx, stage)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_updated ON checkpoints(updated_at);
+"""
+
+
+def batch_key(files_data: Sequence[PDFSource], filenames: Sequence[str]) -> str:
+    """Identifies a batch by its contents, so re-submitting the same files resumes it."""
+    return make_key("batch", *(f"{name}:{source_hash(data)}" for data, name in zip(files_data, filenames)))
+
+
+class CheckpointStore:
+    """SQLite store of per-file pipeline stages. Methods are blocking; FileCheckpoint wraps them for async use."""
+
+    def __init__(self, path: str = CHECKPOINT_DB_PATH, ttl_seconds: int = CHECKPOINT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        """Opens the database on first use and drops expired checkpoints."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn = conn
+        return self._conn
+
+    def load(self, batch: str) -> Dict[int, Dict[str, Any]]:
+        """Every checkpointed stage of a batch, as {file index: {stage: value}}."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT idx, stage, value FROM checkpoints WHERE batch_id = ? AND updated_at >= ?",
+                (batch, time.time() - self.ttl_seconds),
+            ).fetchall()
+        stages: Dict[int, Dict[str, Any]] = {}
+        for idx, stage, value in rows:
+            stages.setdefault(idx, {})[stage] = json.loads(value)
+        return stages
+
+    def save(self, batch: str, idx: int, stage: str, value: Any) -> None:
+        encoded = json.dumps(value)
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO checkpoints (batch_id, idx, stage, value, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (batch, idx, stage, encoded, time.time()),
+            )
+
+    def discard(self, batch: str) -> None:
+        with self._lock:
+            self._db().execute("DELETE FROM checkpoints WHERE batch_id = ?", (batch,))
+
+
+class FileCheckpoint:
+    """One file's view of a batch checkpoint: stages loaded up front, writes go to the store.
+
+    A store write that fails is logged and otherwise ignored; checkpoints save work
+    on a retry but are never required to finish one.
+    """
+
+    def __init__(self, store: Optional[CheckpointStore], batch: str, idx: int, stages: Dict[str, Any]):
+        self.store = store
+        self.batch = batch
+        self.idx = idx
+        self.stages = stages
+
+    def get(self, stage: str) -> Optional[Any]:
+        return self.stages.get(stage)
+
+    async def save(self, stage: str, value: Any) -> None:
+        self.stages[stage] = value
+        if self.store is None:
+            return
+        try:
+            await asyncio.to_thread(self.store.save, self.batch, self.idx, stage, value)
+        except sqlite3.Error as e:
+            logger.warning("Could not checkpoint %s of file %d: %s", stage, self.idx, e)
+
+
+async def load_batch(batch: str, files: int) -> List[FileCheckpoint]:
+    """One FileCheckpoint per file, pre-filled with whatever an earlier run of the batch saved."""
+    store = checkpoint_store if CHECKPOINT_ENABLED else None
+    stages: Dict[int, Dict[str, Any]] = {}
+    if store is not None:
+        try:
+            stages = await asyncio.to_thread(store.load, batch)
+        except sqlite3.Error as e:
+            logger.warning("Could not load checkpoints for batch %s: %s", batch, e)
+    return [FileCheckpoint(store, batch, i, stages.get(i, {})) for i in range(files)]
+
+
+async def discard_batch(batch: str) -> None:
+    if not CHECKPOINT_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(checkpoint_store.discard, batch)
+    except sqlite3.Error as e:
+        logger.warning("Could not discard checkpoints for batch %s: %s", batch, e)
+
+
+checkpoint_store = CheckpointStore()
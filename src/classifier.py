@@ -0,0 +1,113 @@
+# src/classifier.py
+
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from src.prompts import CLASSIFIER_KEYWORDS
+
+# Below this confidence the pipeline asks the LLM classifier instead.
+CLASSIFIER_CONFIDENCE_THRESHOLD = float(os.getenv("CLASSIFIER_CONFIDENCE_THRESHOLD", "0.6"))
+# Occurrences of one term counted per page, so a long table of "Amount" columns can't dominate.
+MAX_TERM_HITS_PER_PAGE = 5
+# Minimum page score for a page to count as belonging to a document type.
+MIN_PAGE_SCORE = 2.0
+
+_TERM_TYPES: Dict[str, List[tuple]] = {}
+for _doc_type, _terms in CLASSIFIER_KEYWORDS.items():
+    for _term, _weight in _terms.items():
+        _TERM_TYPES.setdefault(_term, []).append((_doc_type, _weight))
+
+# One alternation over every term, longest first so "bill date" wins over "bill".
+_KEYWORD_PATTERN = re.compile(
+    r"\b(" + "|".join(
+        r"\s+".join(re.escape(word) for word in term.split())
+        for term in sorted(_TERM_TYPES, key=len, reverse=True)
+    ) + r")\b",
+    re.IGNORECASE,
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class PageClassification:
+    page: int
+    doc_type: str
+    confidence: float
+    scores: Dict[str, float]
+
+
+@dataclass
+class Classification:
+    doc_type: str
+    confidence: float
+    pages: List[PageClassification] = field(default_factory=list)
+
+    def pages_for(self, doc_type: str, text_by_page: List[str]) -> List[str]:
+        """Pages routed to the extractor for `doc_type`.
+
+        Keeps the first page (patient and hospital header), pages classified as
+        `doc_type`, and pages with no clear type. Falls back to the whole
+        document if nothing else would be sent.
+        """
+        selected = [
+            text for page, text in zip(self.pages, text_by_page)
+            if page.page == 1 or page.doc_type in (doc_type, "other")
+        ]
+        if len(selected) <= 1:
+            selected = text_by_page
+        return selected
+
+    def text_for(self, doc_type: str, text_by_page: List[str]) -> str:
+        return "\n".join(self.pages_for(doc_type, text_by_page))
+
+
+def score_page(text: str) -> Dict[str, float]:
+    hits = Counter(_WHITESPACE.sub(" ", m.group(1).lower()) for m in _KEYWORD_PATTERN.finditer(text))
+    scores = {doc_type: 0.0 for doc_type in CLASSIFIER_KEYWORDS}
+    for term, count in hits.items():
+        for doc_type, weight in _TERM_TYPES[term]:
+            scores[doc_type] += weight * min(count, MAX_TERM_HITS_PER_PAGE)
+    return scores
+
+
+def _page_classification(page: int, text: str) -> PageClassification:
+    scores = score_page(text)
+    doc_type, top = max(scores.items(), key=lambda item: item[1])
+    total = sum(scores.values())
+    if top < MIN_PAGE_SCORE:
+        return PageClassification(page, "other", 0.0, scores)
+    return PageClassification(page, doc_type, top / total, scores)
+
+
+def classify_pages(text_by_page: List[str]) -> Classification:
+    """Classifies a document from weighted keyword scores on each page.
+
+    Returns 'consolidated_claim' when some pages read as a bill and others as a
+    discharge summary. Confidence is the score-weighted mean of page confidences,
+    i.e. how cleanly the keyword evidence points at the chosen type(s).
+    """
+    pages = [_page_classification(i + 1, text) for i, text in enumerate(text_by_page)]
+    typed = [p for p in pages if p.doc_type != "other"]
+    if not typed:
+        return Classification("other", 0.0, pages)
+
+    page_types = {p.doc_type for p in typed}
+    weights = [max(p.scores.values()) for p in typed]
+    confidence = sum(p.confidence * w for p, w in zip(typed, weights)) / sum(weights)
+
+    totals = Counter()
+    for p in typed:
+        totals.update(p.scores)
+
+    # Either separate bill and summary pages, or both kinds of evidence in comparable amounts.
+    bill, summary = totals["bill"], totals["discharge_summary"]
+    mixed = min(bill, summary) >= 2 * MIN_PAGE_SCORE and min(bill, summary) / max(bill, summary) >= 0.3
+    if {"bill", "discharge_summary"} <= page_types or mixed:
+        # Bill and summary evidence agree with a consolidated claim rather than compete.
+        return Classification("consolidated_claim", (bill + summary) / sum(totals.values()), pages)
+
+    doc_type = max(page_types, key=lambda t: totals[t])
+    return Classification(doc_type, confidence, pages)
@@ -0,0 +1,166 @@
+# src/context.py
+
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+# Prompt budget for the document part of an extraction / classification request.
+# Token counts are estimated at CHARS_PER_TOKEN characters per token.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CLASSIFY_TOKEN_BUDGET = int(os.getenv("CLASSIFY_TOKEN_BUDGET", "1000"))
+CHARS_PER_TOKEN = 4
+
+# Lines from the top of page 1 always sent: hospital name, patient banner.
+HEADER_LINES = 8
+# Lines from the top of every page sent for classification.
+CLASSIFY_LINES_PER_PAGE = 12
+
+# Field-bearing headings per target schema, with weights and how many lines
+# after the heading belong to its value (diagnoses run over several lines).
+FIELD_HEADINGS: Dict[str, Dict[str, tuple]] = {
+    "bill": {
+        "patient name": (3.0, 1), "hospital": (1.5, 0),
+        "bill date": (3.0, 1), "invoice date": (3.0, 1), "date of service": (3.0, 1), "bill no": (1.0, 0),
+        "grand total": (3.0, 1), "net payable": (3.0, 1), "total amount": (3.0, 1), "amount paid": (2.0, 1),
+        "total": (1.5, 0),
+        "maxid": (3.0, 1), "uhid": (2.5, 1), "patient id": (2.5, 1), "policy no": (3.0, 1),
+        "policy number": (3.0, 1), "claim number": (2.5, 1), "ccn": (2.0, 1), "episode id": (2.5, 1),
+    },
+    "discharge_summary": {
+        "patient name": (3.0, 1), "hospital": (1.5, 0), "discharge summary": (2.0, 0),
+        "final diagnosis": (4.0, 3), "diagnosis": (3.0, 3),
+        "date of admission": (3.0, 1), "admission date": (3.0, 1),
+        "discharge date": (3.0, 1), "discharged on": (3.0, 1),
+    },
+}
+FIELD_HEADINGS["combined"] = {
+    term: max(FIELD_HEADINGS["bill"].get(term, (0, 0)), FIELD_HEADINGS["discharge_summary"].get(term, (0, 0)))
+    for term in {**FIELD_HEADINGS["bill"], **FIELD_HEADINGS["discharge_summary"]}
+}
+FIELD_HEADINGS["id_card"] = {
+    term: FIELD_HEADINGS["bill"][term]
+    for term in ("patient name", "maxid", "uhid", "patient id", "policy no", "policy number")
+}
+
+
+def _compile(headings: Dict[str, tuple]) -> re.Pattern:
+    terms = sorted(headings, key=len, reverse=True)
+    return re.compile(
+        r"\b(" + "|".join(r"\s+".join(re.escape(w) for w in t.split()) for t in terms) + r")\b",
+        re.IGNORECASE,
+    )
+
+
+_HEADING_PATTERNS = {target: _compile(headings) for target, headings in FIELD_HEADINGS.items()}
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class Section:
+    page: int
+    start: int  # index into DocumentIndex.lines
+    end: int    # exclusive
+    score: float
+    terms: Set[str] = field(default_factory=set)
+
+
+class DocumentIndex:
+    """Line index over a document's pages, built once and queried per target schema."""
+
+    def __init__(self, text_by_page: List[str]):
+        self.text_by_page = text_by_page
+        self.lines: List[str] = []
+        self.page_starts: List[int] = []
+        for text in text_by_page:
+            self.page_starts.append(len(self.lines))
+            self.lines.extend(text.splitlines())
+        self.total_chars = sum(len(text) for text in text_by_page)
+
+    def sections(self, target: str) -> List[Section]:
+        """Heading hits for `target`, each with the lines carrying its value."""
+        pattern, headings = _HEADING_PATTERNS[target], FIELD_HEADINGS[target]
+        found = []
+        page = 0
+        for i, line in enumerate(self.lines):
+            while page + 1 < len(self.page_starts) and self.page_starts[page + 1] <= i:
+                page += 1
+            matches = pattern.findall(line)
+            if not matches:
+                continue
+            terms = {_WHITESPACE.sub(" ", m.lower()) for m in matches}
+            score = sum(headings[t][0] for t in terms)
+            tail = max(headings[t][1] for t in terms)
+            found.append(Section(page + 1, i, min(i + 1 + tail, len(self.lines)), score, terms))
+        return found
+
+
+def _rank(sections: List[Section], headings: Dict[str, tuple]) -> List[Section]:
+    """Orders sections by score, discounting headings already seen earlier in the document.
+
+    The first "Patient Name" matters; the same banner repeated on 30 lab pages does not.
+    """
+    seen = Counter()
+    effective = []
+    for section in sections:
+        effective.append(sum(headings[t][0] / (1 + seen[t]) for t in section.terms))
+        seen.update(section.terms)
+    order = sorted(range(len(sections)), key=lambda i: effective[i], reverse=True)
+    return [sections[i] for i in order]
+
+
+def _render(index: DocumentIndex, chosen: set) -> str:
+    """Joins chosen line numbers in document order, marking gaps with '...'."""
+    out, previous = [], None
+    for i in sorted(chosen):
+        if previous is not None and i != previous + 1:
+            out.append("...")
+        out.append(index.lines[i])
+        previous = i
+    return "\n".join(out)
+
+
+def select_context(index: DocumentIndex, target: str, budget_tokens: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Builds a compact prompt context for `target` ('bill', 'discharge_summary', 'combined', 'id_card').
+
+    Documents that fit the budget are sent whole. Otherwise the page-1 header is
+    kept and the highest-scoring heading sections are added until the budget is
+    spent, then emitted in document order.
+    """
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    if index.total_chars + len(index.lines) <= budget_chars:
+        return "\n".join(index.text_by_page)
+
+    sections = index.sections(target)
+    if not sections:
+        return "\n".join(index.text_by_page)[:budget_chars]
+
+    chosen = set(range(min(HEADER_LINES, len(index.lines))))
+    used = sum(len(index.lines[i]) + 1 for i in chosen)
+    for section in _rank(sections, FIELD_HEADINGS[target]):
+        new_lines = [i for i in range(section.start, section.end) if i not in chosen]
+        cost = sum(len(index.lines[i]) + 1 for i in new_lines)
+        if used + cost > budget_chars:
+            continue
+        chosen.update(new_lines)
+        used += cost
+    return _render(index, chosen)
+
+
+def select_classification_context(index: DocumentIndex, budget_tokens: int = CLASSIFY_TOKEN_BUDGET) -> str:
+    """The top lines of every page, where titles like 'DISCHARGE SUMMARY' or 'INVOICE' sit."""
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    page_ends = index.page_starts[1:] + [len(index.lines)]
+    chosen, used = set(), 0
+    for depth in range(CLASSIFY_LINES_PER_PAGE):
+        for start, page_end in zip(index.page_starts, page_ends):
+            i = start + depth
+            if i >= page_end:
+                continue
+            cost = len(index.lines[i]) + 1
+            if used + cost > budget_chars:
+                return _render(index, chosen)
+            chosen.add(i)
+            used += cost
+    return _render(index, chosen)
@@ -0,0 +1,225 @@
+# src/dedup.py
+
+import asyncio
+import hashlib
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+# Near-duplicate files in a batch are extracted once; the copies reuse the canonical
+# file's documents. Pages repeated within a file are sent to the LLM once.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+# Candidate matches: SimHash fingerprints at most this many bits apart (out of 64).
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "10"))
+# A candidate is only a duplicate when this share of word trigrams is common to both
+# texts (Jaccard). Same-template documents of different patients stay well below it.
+DEDUP_MIN_SIMILARITY = float(os.getenv("DEDUP_MIN_SIMILARITY", "0.9"))
+# Pages with fewer word trigrams than this (blank pages, failed OCR) are never matched.
+DEDUP_MIN_SHINGLES = int(os.getenv("DEDUP_MIN_SHINGLES", "8"))
+
+FINGERPRINT_BITS = 64
+SHINGLE_WORDS = 3
+
+_WORD = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str) -> FrozenSet[int]:
+    """64-bit hashes of the text's overlapping word trigrams, case- and whitespace-insensitive."""
+    words = _WORD.findall(text.lower())
+    return frozenset(
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode(), digest_size=8).digest(), "big")
+        for i in range(max(len(words) - SHINGLE_WORDS + 1, 0))
+    )
+
+
+def simhash(hashes: Iterable[int]) -> int:
+    """Charikar's SimHash: bit b is set when most of the features have bit b set."""
+    hashes = list(hashes)
+    half = len(hashes) / 2
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if sum((h >> bit) & 1 for h in hashes) > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def similarity(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+@dataclass(frozen=True)
+class Text:
+    """A page or a whole document: its SimHash, for finding candidates, and its shingles, for confirming them."""
+    fingerprint: int
+    shingles: FrozenSet[int]
+
+
+@dataclass(frozen=True)
+class Fingerprints:
+    document: Text
+    # One per page; None for pages with too little text to compare.
+    pages: List[Optional[Text]]
+
+
+def fingerprint(text_by_page: Sequence[str]) -> Fingerprints:
+    """Fingerprints of a file's pages and of the whole document. CPU-bound; run it in the extraction pool."""
+    pages, everything = [], set()
+    for text in text_by_page:
+        shingles = shingle_hashes(text)
+        everything |= shingles
+        pages.append(Text(simhash(shingles), shingles) if len(shingles) >= DEDUP_MIN_SHINGLES else None)
+    return Fingerprints(Text(simhash(everything), frozenset(everything)), pages)
+
+
+class _TextIndex:
+    """Texts by fingerprint. Fingerprints are split into max_distance + 1 bands, so two within
+    max_distance bits share at least one band exactly (pigeonhole) and a lookup compares only
+    texts in those buckets; candidates are then confirmed by shingle similarity."""
+
+    def __init__(self, max_distance: int = DEDUP_MAX_DISTANCE, min_similarity: float = DEDUP_MIN_SIMILARITY):
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        bands = max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        self._bands = [(i * width, (1 << (width if i < bands - 1 else FINGERPRINT_BITS - i * width)) - 1)
+                       for i in range(bands)]
+        self._buckets: Dict[Tuple[int, int], List[Tuple[Text, Hashable]]] = defaultdict(list)
+
+    def _keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        return [(i, (fingerprint >> shift) & mask) for i, (shift, mask) in enumerate(self._bands)]
+
+    def add(self, text: Text, value: Hashable) -> None:
+        for key in self._keys(text.fingerprint):
+            self._buckets[key].append((text, value))
+
+    def matches(self, text: Text) -> Dict[Hashable, float]:
+        """Every value stored under a near-duplicate of `text`, with its best similarity."""
+        found: Dict[Hashable, float] = {}
+        checked = set()
+        for key in self._keys(text.fingerprint):
+            for other, value in self._buckets.get(key, ()):
+                if id(other) in checked:
+                    continue
+                checked.add(id(other))
+                if distance(text.fingerprint, other.fingerprint) > self.max_distance:
+                    continue
+                score = similarity(text.shingles, other.shingles)
+                if score >= self.min_similarity and score > found.get(value, 0.0):
+                    found[value] = score
+        return found
+
+
+def collapse_repeated_pages(text_by_page: List[str], pages: Sequence[Optional[Text]]) -> List[str]:
+    """`text_by_page` without pages that repeat an earlier page of the same file (e.g. bill header pages)."""
+    kept: List[str] = []
+    seen = _TextIndex()
+    for text, page in zip(text_by_page, pages):
+        if page is not None:
+            if seen.matches(page):
+                continue
+            seen.add(page, len(kept))
+        kept.append(text)
+    return kept
+
+
+@dataclass(frozen=True)
+class DuplicateLink:
+    index: int
+    filename: str
+    canonical_index: int
+    canonical_filename: str
+    # "duplicate": the same document; "contained": every page also appears in the canonical file.
+    match: str
+    # Share of word trigrams in common (the lowest over pages for "contained").
+    similarity: float
+
+
+class BatchDeduplicator:
+    """Finds files in a batch whose text was already seen and hands them the canonical extraction.
+
+    Files register as soon as their text is known. The first file with some content
+    becomes canonical for it; later files that are the same document, or whose every
+    page matches a page of one canonical file, are linked to it and wait for its
+    documents instead of calling the LLM. Matching is done within the batch only.
+    """
+
+    def __init__(self, max_distance: int = DEDUP_MAX_DISTANCE, min_similarity: float = DEDUP_MIN_SIMILARITY):
+        self.links: Dict[int, DuplicateLink] = {}
+        self._filenames: Dict[int, str] = {}
+        self._page_counts: Dict[int, int] = {}
+        self._documents = _TextIndex(max_distance, min_similarity)
+        self._pages = _TextIndex(max_distance, min_similarity)
+        self._results: Dict[int, "asyncio.Future"] = {}
+
+    def register(self, index: int, filename: str, fingerprints: Fingerprints) -> Optional[DuplicateLink]:
+        """Links the file to an earlier near-duplicate, or makes it canonical for later ones.
+
+        Registering a file again (a retried attempt) returns its earlier outcome.
+        """
+        if index in self.links or index in self._results:
+            return self.links.get(index)
+        pages = [page for page in fingerprints.pages if page is not None]
+        if not pages:
+            return None
+
+        link = self._match(index, filename, fingerprints.document, pages)
+        if link is not None:
+            self.links[index] = link
+            return link
+
+        self._filenames[index] = filename
+        self._page_counts[index] = len(pages)
+        self._results[index] = asyncio.get_running_loop().create_future()
+        self._documents.add(fingerprints.document, index)
+        for page in pages:
+            self._pages.add(page, index)
+        return None
+
+    def _match(self, index: int, filename: str, document: Text, pages: List[Text]) -> Optional[DuplicateLink]:
+        same = {i: s for i, s in self._documents.matches(document).items() if self._page_counts[i] == len(pages)}
+        if same:
+            canonical = max(same, key=same.get)
+            return DuplicateLink(index, filename, canonical, self._filenames[canonical], "duplicate",
+                                 round(same[canonical], 3))
+
+        # Every page has to match a page of the same canonical file.
+        candidates: Optional[Dict[int, float]] = None
+        for page in pages:
+            found = self._pages.matches(page)
+            if candidates is None:
+                candidates = found
+            else:
+                candidates = {i: min(s, found[i]) for i, s in candidates.items() if i in found}
+            if not candidates:
+                return None
+        canonical = max(candidates, key=candidates.get)
+        return DuplicateLink(index, filename, canonical, self._filenames[canonical], "contained",
+                             round(candidates[canonical], 3))
+
+    def settled(self, link: DuplicateLink) -> bool:
+        """True once the canonical file has published its documents or failed."""
+        return self._results[link.canonical_index].done()
+
+    async def until_settled(self, link: DuplicateLink) -> None:
+        """Waits for the canonical file, however long its own attempts take."""
+        await asyncio.wait([self._results[link.canonical_index]])
+
+    async def wait(self, link: DuplicateLink) -> Optional[tuple]:
+        """The canonical file's (documents, field sources), or None if it failed. A file
+        whose canonical failed is unlinked, so it is extracted on its own."""
+        result = await asyncio.shield(self._results[link.canonical_index])
+        if result is None:
+            self.links.pop(link.index, None)
+        return result
+
+    def resolve(self, index: int, result: Optional[tuple]) -> None:
+        """Publishes a canonical file's (documents, field sources); None when it failed."""
+        future = self._results.get(index)
+        if future is not None and not future.done():
+            future.set_result(result)
@@ -0,0 +1,40 @@
+# src/executor.py
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes used for pdfplumber / Poppler / Tesseract work.
+# Defaults to one per core.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "0")) or os.cpu_count() or 1
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_extraction_executor() -> ProcessPoolExecutor:
+    """Returns the shared process pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        logger.info("Starting extraction pool with %d worker(s)", EXTRACTION_WORKERS)
+        _executor = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _executor
+
+
+async def run_in_extraction_pool(fn: Callable[..., T], *args) -> T:
+    """Runs a CPU-bound, picklable function in the pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_extraction_executor(), partial(fn, *args))
+
+
+def shutdown_extraction_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
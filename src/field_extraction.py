@@ -0,0 +1,195 @@
+# src/field_extraction.py
+
+import os
+import re
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Dict, List, Optional, Union
+
+# Label -> (field, priority, value kind). Lower priority wins; ties go to the
+# earliest occurrence in the document. Spaces in a label match any whitespace.
+LABELS: Dict[str, tuple] = {
+    "MaxID": ("policy_id", 0, "id"),
+    "Patient ID": ("policy_id", 1, "id"),
+    "Episode ID": ("policy_id", 2, "id"),
+    "UHID": ("policy_id", 2, "id"),
+    "Policy Number": ("policy_id", 2, "id"),
+    "Policy No": ("policy_id", 2, "id"),
+    "Claim Number": ("policy_id", 2, "id"),
+    "CCN": ("policy_id", 2, "id"),
+
+    "Date of Admission": ("admission_date", 0, "date"),
+    "Admission Date": ("admission_date", 1, "date"),
+    "Discharge Date": ("discharge_date", 0, "date"),
+    "Discharged On": ("discharge_date", 1, "date"),
+    "Bill Date": ("date_of_service", 0, "date"),
+    "Date of Service": ("date_of_service", 1, "date"),
+    "Invoice Date": ("date_of_service", 2, "date"),
+
+    "Grand Total": ("total_amount", 0, "amount"),
+    "Net Payable": ("total_amount", 1, "amount"),
+    "Total Amount Due": ("total_amount", 2, "amount"),
+    "Total Amount": ("total_amount", 2, "amount"),
+    "Amount Payable": ("total_amount", 2, "amount"),
+
+    "FINAL DIAGNOSIS": ("diagnosis", 0, "block"),
+    "DIAGNOSIS": ("diagnosis", 1, "block"),
+
+    "Patient Name": ("patient_name", 0, "name"),
+    "Patient's Name": ("patient_name", 0, "name"),
+}
+
+# Bare numbers, used only when no labelled total exists (largest wins). Digits inside
+# IDs (POL550047120, MAX.4417382) are not numbers.
+UNLABELLED_AMOUNT_PRIORITY = 99
+
+# Confidence of a value by the priority of its label; a bare number is a guess.
+PRIORITY_CONFIDENCE = {0: 0.95, 1: 0.9, 2: 0.8}
+UNLABELLED_AMOUNT_CONFIDENCE = 0.3
+# Multiplier when another label of the same priority gives a different value.
+CONFLICT_PENALTY = 0.5
+# Fields at or above this confidence are trusted without asking the LLM (regex_first mode).
+FIELD_CONFIDENCE_THRESHOLD = float(os.getenv("FIELD_CONFIDENCE_THRESHOLD", "0.8"))
+# Longer "names" are a table row or sentence picked up after the label.
+MAX_NAME_WORDS = 6
+
+_VALUE_PATTERNS = {
+    "id": re.compile(r"[\s:.\-#]*([A-Z0-9][A-Z0-9./\-]*)", re.IGNORECASE),
+    "date": re.compile(r"\s*[:\-]?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})"),
+    "amount": re.compile(r"[\s:\-]*(?:Rs\.?|INR|₹)?\s*([0-9][0-9,]*(?:\.[0-9]{1,2})?)", re.IGNORECASE),
+    "block": re.compile(r"[:\-\s]*([\s\S]{0,200})"),
+    "name": re.compile(r"[ \t]*[:\-]?[ \t]*([A-Za-z][A-Za-z.' ]*?)(?=[ \t]{2,}|[ \t]*\r?\n|[ \t]*$|\s+(?:UHID|Age|MaxID|Patient\s*ID)\b)", re.IGNORECASE),
+}
+
+_NUMBER = re.compile(r"(?<![\w.,])[0-9][0-9,]*(?:\.[0-9]{1,2})?")
+
+
+def _label_key(label: str) -> str:
+    return "".join(label.lower().split())
+
+
+def _trie_pattern(labels) -> str:
+    """Factors labels into a prefix trie ("patient (id|name)") so the regex engine
+    tests one branch per leading character instead of every label at every position."""
+    root: Dict[str, dict] = {}
+    for label in labels:
+        node = root
+        for ch in label.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [
+            (r"\s*" if ch == " " else re.escape(ch)) + emit(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(root)
+
+
+_LABEL_BY_KEY = {_label_key(label): (label, *spec) for label, spec in LABELS.items()}
+_FIRST_LETTERS = "".join(sorted({label[0].lower() for label in LABELS}))
+# Every label in one trie-shaped alternation, so a document is scanned once. The leading
+# character-class lookahead lets the engine skip positions that cannot start a label.
+_MASTER = re.compile(rf"(?=[{_FIRST_LETTERS}])\b" + _trie_pattern(LABELS) + r"\b", re.IGNORECASE)
+
+_DATE_PARTS = re.compile(r"(\d{1,4})([/-])(\d{1,2})\2(\d{1,4})")
+
+
+def normalize_date(date_str: str) -> Optional[str]:
+    """DD-MM-YYYY, DD/MM/YY or YYYY-MM-DD (either separator) to YYYY-MM-DD; None if invalid.
+
+    Parsed by hand: strptime costs more than the whole label scan.
+    """
+    match = _DATE_PARTS.fullmatch(date_str.strip())
+    if not match:
+        return None
+    first, _, month, last = match.groups()
+    if len(first) == 4:
+        year, day = first, last
+    elif len(first) <= 2 and len(last) in (2, 4):
+        day, year = first, last if len(last) == 4 else ("20" if int(last) < 69 else "19") + last
+    else:
+        return None
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _clean_block(raw: str) -> Optional[str]:
+    lines = [line.strip() for line in raw.strip().split("\n")[0:3]]
+    joined = "; ".join(line for line in lines if line)
+    return joined or None
+
+
+@dataclass
+class FieldCandidate:
+    field: str
+    value: Union[str, float]
+    label: str
+    priority: int
+    position: int
+    confidence: float = 0.0
+
+
+def scan_fields(text: str) -> Dict[str, List[FieldCandidate]]:
+    """Finds every labelled field candidate in a single pass over `text`.
+
+    Candidates per field are returned best first (label priority, then position).
+    Without a labelled total, total_amount falls back to the largest bare number.
+    """
+    found: Dict[str, List[FieldCandidate]] = {}
+    for match in _MASTER.finditer(text):
+        label, field, priority, kind = _LABEL_BY_KEY[_label_key(match.group())]
+        value_match = _VALUE_PATTERNS[kind].match(text, match.end())
+        if not value_match:
+            continue
+        raw = value_match.group(1)
+        if kind == "date":
+            value = normalize_date(raw)
+        elif kind == "amount":
+            value = float(raw.replace(",", ""))
+        elif kind == "block":
+            value = _clean_block(raw)
+        elif kind == "name":
+            value = " ".join(raw.split())
+            if len(value) < 2 or len(value.split()) > MAX_NAME_WORDS:
+                continue
+        else:
+            value = raw.strip().rstrip("./-")
+        if value:
+            found.setdefault(field, []).append(
+                FieldCandidate(field, value, label, priority, match.start(), PRIORITY_CONFIDENCE[priority])
+            )
+
+    if "total_amount" not in found:
+        numbers = [(float(m.group().replace(",", "")), m.start()) for m in _NUMBER.finditer(text)]
+        if numbers:
+            amount, position = max(numbers)
+            found["total_amount"] = [
+                FieldCandidate("total_amount", amount, "largest number", UNLABELLED_AMOUNT_PRIORITY, position,
+                               UNLABELLED_AMOUNT_CONFIDENCE)
+            ]
+    for candidates in found.values():
+        candidates.sort(key=lambda c: (c.priority, c.position))
+    return found
+
+
+def best_fields(text: str) -> Dict[str, FieldCandidate]:
+    """The top-ranked candidate for each field found in `text`.
+
+    Its confidence is lowered when an equally ranked label in the same text
+    disagrees (e.g. two different "Discharge Date" values).
+    """
+    best = {}
+    for field, candidates in scan_fields(text).items():
+        top = candidates[0]
+        if any(c.priority == top.priority and c.value != top.value for c in candidates[1:]):
+            top = replace(top, confidence=top.confidence * CONFLICT_PENALTY)
+        best[field] = top
+    return best
@@ -0,0 +1,236 @@
+# src/gazetteer.py
+
+import csv
+import difflib
+import heapq
+import logging
+import math
+import os
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One hospital per row: name,aliases (aliases separated by "|"). The canonical name is
+# always an alias of itself. Point this at the full network list in production.
+HOSPITAL_GAZETTEER_PATH = os.getenv(
+    "HOSPITAL_GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "hospitals.csv")
+)
+# Minimum similarity (0-1) for a fuzzy match on noisy OCR text.
+HOSPITAL_FUZZY_THRESHOLD = float(os.getenv("HOSPITAL_FUZZY_THRESHOLD", "0.82"))
+# Fuzzy candidates verified with difflib per query, after the n-gram prefilter.
+FUZZY_CANDIDATES = 8
+# Postings walked per fuzzy query, rarest n-grams first. Bounds the cost on huge
+# gazetteers where common n-grams appear in thousands of names.
+MAX_POSTINGS_PER_QUERY = 5000
+# Lines from the top of the text searched fuzzily; hospital names sit in the header.
+FUZZY_HEADER_LINES = 10
+NGRAM = 3
+# Aliases whose distinctive part is shorter than this ("Max") are matched exactly only;
+# fuzzily they would hit any short OCR token such as an ID prefix.
+MIN_FUZZY_KEY_CHARS = 5
+
+# Words shared by most hospital names. They are ignored by the fuzzy index, so
+# posting lists stay short and "X Hospital" doesn't match every other hospital.
+GENERIC_WORDS = {
+    "hospital", "hospitals", "clinic", "clinics", "medical", "centre", "center", "healthcare", "health",
+    "care", "institute", "sciences", "science", "research", "multispeciality", "multispecialty",
+    "super", "speciality", "specialty", "the", "of", "and", "ltd", "limited", "pvt", "private", "trust",
+    "memorial", "general", "nursing", "home",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase words separated by single spaces; punctuation and OCR debris become spaces."""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+@dataclass
+class HospitalMatch:
+    name: str       # canonical name
+    alias: str      # normalized alias that matched
+    score: float    # 1.0 for exact alias matches
+    position: int   # token offset of the match (exact) or line number (fuzzy)
+
+
+class _TokenAutomaton:
+    """Aho-Corasick automaton over word tokens.
+
+    Scanning costs O(tokens in the text + matches), independent of how many aliases
+    are loaded, and matches always align to whole words.
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, int]]] = [[]]  # (alias id, alias length in tokens)
+
+    def add(self, tokens: List[str], alias_id: int) -> None:
+        state = 0
+        for token in tokens:
+            nxt = self.goto[state].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append((alias_id, len(tokens)))
+
+    def build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                if state:
+                    f = self.fail[state]
+                    while f and token not in self.goto[f]:
+                        f = self.fail[f]
+                    self.fail[nxt] = self.goto[f].get(token, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, tokens: List[str]) -> Iterable[Tuple[int, int]]:
+        """Yields (alias id, start token) for every alias occurrence."""
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for alias_id, length in self.out[state]:
+                yield alias_id, i - length + 1
+
+
+class Gazetteer:
+    """Hospital names and aliases with exact (automaton) and fuzzy (n-gram index) lookup.
+
+    Loaded from `path` on first use.
+    """
+
+    def __init__(self, path: str = HOSPITAL_GAZETTEER_PATH, rows: Optional[List[Tuple[str, List[str]]]] = None):
+        self.path = path
+        self._rows = rows
+        self._loaded = False
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        rows = self._rows if self._rows is not None else self._read(self.path)
+        self.names: List[str] = []     # alias id -> canonical name
+        self.aliases: List[str] = []   # alias id -> normalized alias
+        self.keys: List[str] = []      # alias id -> alias without generic words (fuzzy key)
+        self.key_grams: List[int] = []  # alias id -> distinct n-grams in its key
+        self.automaton = _TokenAutomaton()
+        self.ngrams: Dict[str, List[int]] = {}
+        seen = set()
+        for name, aliases in rows:
+            for alias in [name, *aliases]:
+                normalized = normalize(alias)
+                if not normalized or normalized in seen:
+                    continue
+                seen.add(normalized)
+                alias_id = len(self.aliases)
+                self.names.append(name)
+                self.aliases.append(normalized)
+                self.automaton.add(normalized.split(), alias_id)
+                key = " ".join(w for w in normalized.split() if w not in GENERIC_WORDS) or normalized
+                self.keys.append(key)
+                grams = set(_ngrams(key)) if len(key) >= MIN_FUZZY_KEY_CHARS else set()
+                self.key_grams.append(len(grams))
+                for gram in grams:
+                    self.ngrams.setdefault(gram, []).append(alias_id)
+        self.automaton.build()
+        self._loaded = True
+        logger.info("Loaded hospital gazetteer: %d hospitals, %d aliases", len(set(self.names)), len(self.aliases))
+
+    @staticmethod
+    def _read(path: str) -> List[Tuple[str, List[str]]]:
+        rows = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                name = (row.get("name") or "").strip()
+                if name:
+                    aliases = [a.strip() for a in (row.get("aliases") or "").split("|") if a.strip()]
+                    rows.append((name, aliases))
+        return rows
+
+    def __len__(self) -> int:
+        self._load()
+        return len(set(self.names))
+
+    def find_exact(self, text: str) -> List[HospitalMatch]:
+        """Every alias occurring in `text` as whole words, in text order."""
+        self._load()
+        tokens = normalize(text).split()
+        return [
+            HospitalMatch(self.names[alias_id], self.aliases[alias_id], 1.0, start)
+            for alias_id, start in sorted(self.automaton.scan(tokens), key=lambda m: m[1])
+        ]
+
+    def find_fuzzy(self, query: str) -> Optional[HospitalMatch]:
+        """Closest alias in `query` (e.g. one OCR'd line) at or above HOSPITAL_FUZZY_THRESHOLD.
+
+        Candidates come from n-gram posting lists, so only aliases sharing some
+        distinctive trigram with the query are considered, ranked by how much of
+        the alias the query covers. Each candidate alias (generic words included,
+        so "Kumar" in a patient line can't pass for "Kumara Hospitals") is then
+        compared with difflib against the best window of query words of its length.
+        """
+        self._load()
+        tokens = normalize(query).split()
+        words = [w for w in tokens if w not in GENERIC_WORDS]
+        if not words:
+            return None
+        postings_lists = sorted(
+            (self.ngrams[gram] for gram in set(_ngrams(" ".join(words))) if gram in self.ngrams), key=len
+        )
+        shared = Counter()
+        budget = MAX_POSTINGS_PER_QUERY
+        for postings in postings_lists:
+            if len(postings) > budget:
+                break
+            budget -= len(postings)
+            weight = math.log(len(self.aliases) / len(postings)) + 1.0
+            for alias_id in postings:
+                shared[alias_id] += weight
+        candidates = heapq.nlargest(FUZZY_CANDIDATES, shared, key=lambda a: shared[a] / self.key_grams[a])
+        best = None
+        for alias_id in candidates:
+            alias = self.aliases[alias_id]
+            width = len(alias.split())
+            score = max(
+                difflib.SequenceMatcher(None, alias, " ".join(tokens[i:i + width])).ratio()
+                for i in range(max(len(tokens) - width + 1, 1))
+            )
+            if score >= HOSPITAL_FUZZY_THRESHOLD and (best is None or score > best.score):
+                best = HospitalMatch(self.names[alias_id], self.aliases[alias_id], score, 0)
+        return best
+
+    def match(self, text: str, fuzzy: bool = False) -> Optional[HospitalMatch]:
+        """The hospital named in `text`: the earliest exact alias (longest on ties), else,
+        with `fuzzy`, the best fuzzy match among the first FUZZY_HEADER_LINES lines."""
+        exact = self.find_exact(text)
+        if exact:
+            return min(exact, key=lambda m: (m.position, -len(m.alias)))
+        if not fuzzy:
+            return None
+        best = None
+        for line_no, line in enumerate(text.splitlines()[:FUZZY_HEADER_LINES]):
+            found = self.find_fuzzy(line)
+            if found and (best is None or found.score > best.score):
+                found.position = line_no
+                best = found
+        return best
+
+
+def _ngrams(key: str) -> List[str]:
+    padded = f" {key} "
+    return [padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)]
+
+
+hospital_gazetteer = Gazetteer()
@@ -0,0 +1,233 @@
+# src/grouping.py
+
+import difflib
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.field_extraction import normalize_date
+from src.gazetteer import hospital_gazetteer, normalize
+from src.schemas import InitialExtraction
+
+# Two differently written names are the same patient at or above this similarity (0-1).
+NAME_SIMILARITY_THRESHOLD = float(os.getenv("NAME_SIMILARITY_THRESHOLD", "0.85"))
+# Documents from the same hospital within this many days of each other are compared.
+DATE_WINDOW_DAYS = int(os.getenv("DATE_WINDOW_DAYS", "7"))
+# Blocks larger than this (a very common policy prefix, a busy hospital week) are too
+# unselective to compare pairwise and are skipped; exact-name links still apply.
+MAX_BLOCK_SIZE = int(os.getenv("MAX_BLOCK_SIZE", "1000"))
+
+HONORIFICS = {"mr", "mrs", "ms", "miss", "dr", "master", "baby", "shri", "sri", "smt", "kumari", "late"}
+_POLICY_JUNK = re.compile(r"[^A-Z0-9]")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """'Mr. RAJESH  Kumar.' -> 'rajesh kumar'."""
+    if not name:
+        return ""
+    return " ".join(w for w in normalize(name).split() if w not in HONORIFICS)
+
+
+def normalize_policy_id(policy_id: Optional[str]) -> str:
+    """Upper-case alphanumerics only: 'max.441-7382' and 'MAX4417382' block together."""
+    if not policy_id or policy_id == "0":
+        return ""
+    return _POLICY_JUNK.sub("", policy_id.upper())
+
+
+def _hospital_key(hospital_name: Optional[str]) -> str:
+    if not hospital_name:
+        return ""
+    match = hospital_gazetteer.match(hospital_name)
+    return match.name if match else normalize(hospital_name)
+
+
+def _date_ordinals(doc: InitialExtraction) -> List[int]:
+    ordinals = []
+    for field in ("date_of_service", "admission_date", "discharge_date"):
+        value = getattr(doc, field, None)
+        normalized = normalize_date(value) if value else None
+        if normalized:
+            ordinals.append(date.fromisoformat(normalized).toordinal())
+    return ordinals
+
+
+def _words_match(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    # Short words must match exactly: "Ram" and "Raj" are different people.
+    if min(len(a), len(b)) < 4 or abs(len(a) - len(b)) > 2:
+        return False
+    return difflib.SequenceMatcher(None, a, b).ratio() >= NAME_SIMILARITY_THRESHOLD - 0.05
+
+
+def names_match(a: str, b: str) -> bool:
+    """Same patient, comparing normalized names word by word.
+
+    Matches the same words in any order, a word-for-word match in written or
+    reversed order allowing a typo per longer word, or one name being the other
+    plus a middle name. A name differing by a whole word never matches.
+    """
+    if a == b:
+        return True
+    wa, wb = a.split(), b.split()
+    if sorted(wa) == sorted(wb):
+        return True
+    if len(wa) == len(wb):
+        return all(map(_words_match, wa, wb)) or all(map(_words_match, wa, reversed(wb)))
+    short, long = (wa, wb) if len(wa) < len(wb) else (wb, wa)
+    return len(short) >= 2 and len(long) - len(short) == 1 and all(
+        any(_words_match(s, l) for l in long) for s in short
+    )
+
+
+def _name_keys(name: str) -> set:
+    """Word prefixes used to find comparison candidates inside a block."""
+    return {w[:3] for w in name.split() if len(w) >= 3}
+
+
+class _DisjointSet:
+    """Union-find whose groups hold at most one normalized policy ID: two groups on
+    different non-empty policies are never merged, however closely their names match."""
+
+    def __init__(self, size: int, policies: Optional[Sequence[str]] = None):
+        self.parent = list(range(size))
+        self.policy = list(policies) if policies is not None else [""] * size
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> bool:
+        """Merges the groups of i and j; False when their policies conflict."""
+        ri, rj = self.find(i), self.find(j)
+        if ri == rj:
+            return True
+        pi, pj = self.policy[ri], self.policy[rj]
+        if pi and pj and pi != pj:
+            return False
+        root = min(ri, rj)
+        self.parent[max(ri, rj)] = root
+        self.policy[root] = pi or pj
+        return True
+
+
+def _link_similar(block: List[int], names: List[str], groups: _DisjointSet) -> None:
+    """Unions documents in `block` whose names match.
+
+    Candidate pairs come from an inverted index of word prefixes, so only names
+    sharing a word prefix are compared (two when both names have two or more words).
+    """
+    postings: Dict[str, List[int]] = defaultdict(list)
+    for i in block:
+        keys = _name_keys(names[i])
+        shared = Counter(j for key in keys for j in postings[key])
+        needed = min(len(keys), 2)
+        for j, count in shared.items():
+            if count >= min(needed, len(_name_keys(names[j]))) and groups.find(i) != groups.find(j) \
+                    and names_match(names[i], names[j]):
+                groups.union(i, j)
+        for key in keys:
+            postings[key].append(i)
+
+
+def group_documents(docs: Sequence[InitialExtraction]) -> List[Tuple[str, List[InitialExtraction]]]:
+    """Groups extracted documents into claims, one group per patient.
+
+    Documents are linked when their normalized names are equal, or when they share a
+    block and their names are compatible. Documents on different non-empty policy IDs
+    are never linked, even with equal names; a policy-less document whose name is
+    shared by several policies joins the one of them seen at its hospital, or else is
+    placed by its hospital/date block. Blocks are hash-index buckets on the
+    normalized policy_id and on (hospital, date window); only documents inside the
+    same block are ever compared, so cost grows with block sizes rather than the
+    square of the batch. Within a policy block a missing name is compatible with
+    any name; a nameless document in a hospital/date block joins it only when all
+    named documents there already form one group.
+
+    Returns (identifier, documents) in order of each group's first document. The
+    identifier is the group's most common patient name as written, else its policy ID.
+    """
+    names = [normalize_name(doc.patient_name) for doc in docs]
+    policies = [normalize_policy_id(getattr(doc, "policy_id", None)) for doc in docs]
+    hospitals = [_hospital_key(getattr(doc, "hospital_name", None)) for doc in docs]
+    groups = _DisjointSet(len(docs), policies)
+
+    exact: Dict[str, List[int]] = defaultdict(list)
+    policy_blocks: Dict[str, List[int]] = defaultdict(list)
+    visit_blocks: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+    for i, doc in enumerate(docs):
+        if names[i]:
+            exact[names[i]].append(i)
+        if policies[i]:
+            policy_blocks[policies[i]].append(i)
+        hospital = hospitals[i]
+        if hospital:
+            # Each date lands in its window and the next, so any two dates less than
+            # DATE_WINDOW_DAYS apart share at least one block.
+            windows = {o // DATE_WINDOW_DAYS for o in _date_ordinals(doc)}
+            for window in windows | {w + 1 for w in windows}:
+                visit_blocks[(hospital, window)].append(i)
+
+    # Equal names are one patient unless their documents carry different policies; then
+    # only the documents on each policy are linked here, and a policy-less document joins
+    # the one policy seen at its hospital (several: left to the hospital/date blocks).
+    for block in exact.values():
+        if len({policies[i] for i in block} - {""}) <= 1:
+            for i in block[1:]:
+                groups.union(block[0], i)
+        else:
+            first_on_policy: Dict[str, int] = {}
+            for i in block:
+                if policies[i]:
+                    groups.union(first_on_policy.setdefault(policies[i], i), i)
+            for i in block:
+                if not policies[i] and hospitals[i]:
+                    at_hospital = {policies[j] for j in block if policies[j] and hospitals[j] == hospitals[i]}
+                    if len(at_hospital) == 1:
+                        groups.union(first_on_policy[at_hospital.pop()], i)
+
+    for block in policy_blocks.values():
+        if len(block) > MAX_BLOCK_SIZE:
+            continue
+        named = [i for i in block if names[i]]
+        _link_similar(named, names, groups)
+        # A nameless document on the same policy belongs with the (first) named group.
+        anchor = named[0] if named else block[0]
+        for i in block:
+            if not names[i]:
+                groups.union(anchor, i)
+
+    for block in visit_blocks.values():
+        if len(block) > MAX_BLOCK_SIZE:
+            continue
+        named = [i for i in block if names[i]]
+        _link_similar(named, names, groups)
+        named_roots = {groups.find(i) for i in named}
+        if len(named_roots) == 1:
+            root = named_roots.pop()
+            for i in block:
+                if not names[i]:
+                    groups.union(root, i)
+
+    members: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(docs)):
+        members[groups.find(i)].append(i)
+
+    result = []
+    used = Counter()
+    for root in sorted(members, key=lambda r: members[r][0]):
+        group = [docs[i] for i in members[root]]
+        written = Counter(doc.patient_name.strip() for doc in group if doc.patient_name and doc.patient_name.strip())
+        policies = [doc.policy_id for doc in group if getattr(doc, "policy_id", None)]
+        identifier = written.most_common(1)[0][0] if written else (policies[0] if policies else "unidentified")
+        # Distinct patients can share a written name; keep identifiers unique.
+        used[identifier] += 1
+        if used[identifier] > 1:
+            identifier = f"{identifier} ({used[identifier]})"
+        result.append((identifier, group))
+    return result
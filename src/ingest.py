@@ -0,0 +1,167 @@
+# src/ingest.py
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, List, Optional, Sequence, Union
+
+from src.cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# "spool": uploads are streamed to temp files and passed through the pipeline by path.
+# "memory": uploads are read into bytes, as before.
+INGEST_MODE = os.getenv("INGEST_MODE", "spool")
+# Where spooled uploads live (default: the system temp directory).
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR") or None
+INGEST_CHUNK_BYTES = MB
+# Uploads larger than this in total are rejected with 413.
+MAX_REQUEST_UPLOAD_MB = int(os.getenv("MAX_REQUEST_UPLOAD_MB", "2048"))
+# Total size of the PDFs being extracted at once, per batch and across all batches and
+# jobs; files beyond either budget wait for a slot. Extraction memory grows with the PDF
+# being worked on, so these bound it where MAX_CONCURRENT_FILES alone cannot.
+REQUEST_MEMORY_BUDGET_MB = int(os.getenv("REQUEST_MEMORY_BUDGET_MB", "256"))
+PROCESS_MEMORY_BUDGET_MB = int(os.getenv("PROCESS_MEMORY_BUDGET_MB", "1024"))
+
+
+@dataclass(frozen=True)
+class SpooledPDF:
+    """An upload on disk. Picklable, so extraction workers open the file themselves
+    instead of receiving a copy of its bytes."""
+    path: str
+    size: int
+    sha256: str
+
+    @contextmanager
+    def mapped(self) -> Iterator[Union[mmap.mmap, bytes]]:
+        """The file's contents memory-mapped (paged in by the OS, not copied onto the heap)."""
+        if self.size == 0:
+            yield b""
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+# Everything that takes a PDF (`file_bytes` throughout) accepts either form.
+PDFSource = Union[bytes, SpooledPDF]
+
+
+def source_hash(source: PDFSource) -> str:
+    """content_hash of the PDF's bytes; computed once while spooling for SpooledPDF."""
+    return source.sha256 if isinstance(source, SpooledPDF) else content_hash(source)
+
+
+def source_size(source: PDFSource) -> int:
+    return source.size if isinstance(source, SpooledPDF) else len(source)
+
+
+class UploadTooLarge(Exception):
+    """The request's uploads exceed MAX_REQUEST_UPLOAD_MB."""
+
+
+def _spool_file() -> tuple:
+    fd, path = tempfile.mkstemp(prefix="claim_", suffix=".pdf", dir=INGEST_SPOOL_DIR)
+    return os.fdopen(fd, "wb"), path
+
+
+def spool_bytes(data: Union[bytes, memoryview]) -> SpooledPDF:
+    """Writes bytes already in memory (e.g. a job's stored file) to a spool file."""
+    f, path = _spool_file()
+    with f:
+        f.write(data)
+    return SpooledPDF(path, len(data), hashlib.sha256(data).hexdigest())
+
+
+def discard(sources: Sequence[PDFSource]) -> None:
+    """Removes the spool files among `sources`."""
+    for source in sources:
+        if isinstance(source, SpooledPDF):
+            try:
+                os.remove(source.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Could not remove spooled upload %s: %s", source.path, e)
+
+
+async def ingest_uploads(uploads) -> List[PDFSource]:
+    """Reads FastAPI UploadFiles in INGEST_MODE, INGEST_CHUNK_BYTES at a time.
+
+    In spool mode at most one chunk per upload is in memory. Raises UploadTooLarge
+    (after removing anything already spooled) once the total passes MAX_REQUEST_UPLOAD_MB.
+    """
+    limit = MAX_REQUEST_UPLOAD_MB * MB
+    total = 0
+    sources: List[PDFSource] = []
+    try:
+        for upload in uploads:
+            if INGEST_MODE == "memory":
+                chunks = []
+                while chunk := await upload.read(INGEST_CHUNK_BYTES):
+                    total += len(chunk)
+                    if total > limit:
+                        raise UploadTooLarge(f"Uploads exceed {MAX_REQUEST_UPLOAD_MB} MB")
+                    chunks.append(chunk)
+                sources.append(b"".join(chunks))
+                continue
+
+            f, path = _spool_file()
+            sources.append(SpooledPDF(path, 0, ""))  # placeholder so a failure below cleans it up
+            digest, size = hashlib.sha256(), 0
+            with f:
+                while chunk := await upload.read(INGEST_CHUNK_BYTES):
+                    total += len(chunk)
+                    if total > limit:
+                        raise UploadTooLarge(f"Uploads exceed {MAX_REQUEST_UPLOAD_MB} MB")
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            sources[-1] = SpooledPDF(path, size, digest.hexdigest())
+    except BaseException:
+        discard(sources)
+        raise
+    return sources
+
+
+class MemoryBudget:
+    """A byte-weighted semaphore: holders reserve the size of what they work on and
+    others wait until enough is released. A single reservation larger than the whole
+    budget is admitted alone rather than never."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _cond(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self.in_use = 0
+        return self._condition
+
+    @asynccontextmanager
+    async def reserve(self, amount: int) -> AsyncIterator[None]:
+        amount = min(amount, self.capacity)
+        condition = self._cond()
+        async with condition:
+            await condition.wait_for(lambda: self.in_use + amount <= self.capacity)
+            self.in_use += amount
+        try:
+            yield
+        finally:
+            async with condition:
+                self.in_use -= amount
+                condition.notify_all()
+
+
+process_budget = MemoryBudget(PROCESS_MEMORY_BUDGET_MB * MB)
@@ -0,0 +1,329 @@
+# src/jobs.py
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from src.ingest import INGEST_MODE, PDFSource, SpooledPDF, discard, spool_bytes
+from src.pipeline import DOCUMENT_MODELS, FILE_MAX_ATTEMPTS, FILE_TIMEOUT_SECONDS, stream_pipeline
+from src.schemas import BatchClaimResponse, ClaimResult, DuplicateFile, InitialExtraction
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(".jobs", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+# A running job's worker renews its lease this often, whether or not a file finished.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+# A running job whose lease has not been renewed for this long is considered abandoned
+# (crashed worker) and is picked up again. The default outlasts the longest a single
+# file may legitimately take (FILE_TIMEOUT_SECONDS x FILE_MAX_ATTEMPTS) plus two
+# heartbeats, so a live job is never reclaimed while a slow file is still within budget.
+JOB_LEASE_SECONDS = float(
+    os.getenv("JOB_LEASE_SECONDS")
+    or (FILE_TIMEOUT_SECONDS * FILE_MAX_ATTEMPTS or 10 * JOB_HEARTBEAT_SECONDS) + 2 * JOB_HEARTBEAT_SECONDS
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    data BLOB NOT NULL,
+    status TEXT NOT NULL,
+    documents TEXT,
+    error TEXT,
+    duplicate TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, updated_at);
+"""
+
+
+class JobStore:
+    """SQLite-backed job queue. Methods are blocking; call them through asyncio.to_thread."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._initialised = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection for one transaction: committed (rolled back on error), then closed."""
+        if not self._initialised:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._initialised:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                # Databases created before job_files.duplicate existed.
+                if "duplicate" not in {row[1] for row in conn.execute("PRAGMA table_info(job_files)")}:
+                    conn.execute("ALTER TABLE job_files ADD COLUMN duplicate TEXT")
+                self._initialised = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, files_data: List[PDFSource], filenames: List[str]) -> str:
+        """Stores a batch; spooled files are inserted one at a time straight from their memory map."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, now, now),
+            )
+            for i, (data, name) in enumerate(zip(files_data, filenames)):
+                if isinstance(data, SpooledPDF):
+                    with data.mapped() as mapped:
+                        self._insert_file(conn, job_id, i, name, mapped)
+                else:
+                    self._insert_file(conn, job_id, i, name, data)
+        return job_id
+
+    @staticmethod
+    def _insert_file(conn: sqlite3.Connection, job_id: str, idx: int, filename: str, data) -> None:
+        conn.execute(
+            "INSERT INTO job_files (job_id, idx, filename, data, status) VALUES (?, ?, ?, ?, 'pending')",
+            (job_id, idx, filename, data),
+        )
+
+    def claim_next(self) -> Optional[str]:
+        """Atomically moves the oldest queued (or abandoned) job to 'running' and returns its id."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND updated_at < ?) ORDER BY created_at LIMIT 1",
+                (now - JOB_LEASE_SECONDS,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (now, row[0]),
+            )
+            return row[0]
+
+    def load_files(self, job_id: str):
+        """Returns (files_data, filenames, completed_extractions, duplicates) for a job.
+
+        Files that already finished are returned with empty bytes; their documents
+        come back in completed_extractions so the pipeline skips them; a finished
+        near-duplicate comes back with no documents (its canonical file already has
+        them) and its link in duplicates. Failed files are returned as pending, so a
+        resumed job retries them. In INGEST_MODE "spool"
+        pending files are written to spool files one row at a time; remove them with
+        ingest.discard once the job is done.
+        """
+        files_data: List[PDFSource] = []
+        filenames: List[str] = []
+        completed: Dict[int, List[InitialExtraction]] = {}
+        duplicates: List[DuplicateFile] = []
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT idx, filename, CASE WHEN status = 'done' THEN x'' ELSE data END, status, documents, "
+                    "duplicate FROM job_files WHERE job_id = ? ORDER BY idx",
+                    (job_id,),
+                )
+                for idx, filename, data, status, documents, duplicate in rows:
+                    if status == "done" or INGEST_MODE == "memory":
+                        files_data.append(bytes(data))
+                    else:
+                        files_data.append(spool_bytes(data))
+                    filenames.append(filename)
+                    if status == "done" and duplicate:
+                        completed[idx] = []
+                        duplicates.append(DuplicateFile.model_validate_json(duplicate))
+                    elif status == "done":
+                        completed[idx] = [
+                            DOCUMENT_MODELS[doc["document_type"]](**doc["data"])
+                            for doc in json.loads(documents or "[]")
+                        ]
+        except BaseException:
+            discard(files_data)
+            raise
+        return files_data, filenames, completed, duplicates
+
+    def record_file(
+        self, job_id: str, idx: int, documents: list, error: Optional[str], duplicate: Optional[dict] = None
+    ) -> None:
+        """Stores a file's outcome; `duplicate` is the "file_extracted" event's link to its canonical file."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE job_files SET status = ?, documents = ?, error = ?, duplicate = ? WHERE job_id = ? AND idx = ?",
+                ("failed" if error else "done", json.dumps(documents), error,
+                 json.dumps(duplicate) if duplicate else None, job_id, idx),
+            )
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+
+    def heartbeat(self, job_id: str) -> None:
+        """Renews the lease of a job that is still running."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, result: Optional[BatchClaimResponse], error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (
+                    "failed" if error else "completed",
+                    result.model_dump_json() if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def requeue(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            job = conn.execute(
+                "SELECT status, created_at, updated_at, attempts, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM job_files WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            failed_files = [
+                {"index": idx, "filename": name, "error": error}
+                for idx, name, error in conn.execute(
+                    "SELECT idx, filename, error FROM job_files WHERE job_id = ? AND status = 'failed' ORDER BY idx",
+                    (job_id,),
+                )
+            ]
+        return {
+            "job_id": job_id,
+            "status": job[0],
+            "created_at": job[1],
+            "updated_at": job[2],
+            "attempts": job[3],
+            "error": job[4],
+            "files": {
+                "total": sum(counts.values()),
+                "pending": counts.get("pending", 0),
+                "done": counts.get("done", 0),
+                "failed": counts.get("failed", 0),
+            },
+            "failed_files": failed_files,
+        }
+
+    def result(self, job_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+
+class JobWorkerPool:
+    """Runs queued jobs through the pipeline with JOB_WORKERS concurrent workers."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info("Started %d job worker(s) on %s", self.workers, self.store.path)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                job_id = await asyncio.to_thread(self.store.claim_next)
+            except Exception as e:
+                logger.error("job worker %d: could not claim job: %s", n, e)
+                job_id = None
+            if job_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job_id)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Keeps the job's lease alive while run_job works on it, however long one file takes."""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, job_id)
+            except sqlite3.Error as e:
+                logger.warning("Could not renew the lease of job %s: %s", job_id, e)
+
+    async def run_job(self, job_id: str) -> None:
+        logger.info("Running job %s", job_id)
+        files_data = []
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            files_data, filenames, completed, duplicates = await asyncio.to_thread(self.store.load_files, job_id)
+            claims: List[ClaimResult] = []
+            # Completed files come back as empty bytes, so the job id keys the checkpoints.
+            async for event in stream_pipeline(files_data, filenames, completed, batch_id=job_id):
+                if event["event"] == "file_extracted":
+                    await asyncio.to_thread(
+                        self.store.record_file, job_id, event["index"], event["documents"], event["error"],
+                        event.get("duplicate"),
+                    )
+                    if event.get("duplicate"):
+                        duplicates.append(DuplicateFile(**event["duplicate"]))
+                elif event["event"] == "claim_result":
+                    claims.append(ClaimResult(**event["claim"]))
+            result = BatchClaimResponse(processed_claims=claims, duplicates=duplicates)
+            await asyncio.to_thread(self.store.finish, job_id, result)
+            logger.info("Job %s completed with %d claim(s)", job_id, len(claims))
+        except asyncio.CancelledError:
+            # Shutting down: put the job back so the next worker resumes it from the pending files.
+            await asyncio.shield(asyncio.to_thread(self.store.requeue, job_id))
+            raise
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            await asyncio.to_thread(self.store.finish, job_id, None, str(e))
+        finally:
+            heartbeat.cancel()
+            discard(files_data)
+
+
+job_store = JobStore()
+job_pool = JobWorkerPool(job_store)
@@ -0,0 +1,188 @@
+# src/llm_client.py
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from src.metrics import LLM_REQUESTS, LLM_SECONDS, LLM_TOKENS
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Account limits. Requests wait in the token buckets instead of tripping 429s.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "150000"))
+# Process-wide cap on in-flight requests (the pipeline also limits per batch).
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1.0"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30.0"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "90.0"))
+
+# Completion tokens reserved up front when a request doesn't set max_tokens;
+# corrected from the reported usage once the response arrives.
+_EXPECTED_COMPLETION_TOKENS = 300
+_CHARS_PER_TOKEN = 4
+
+
+def retryable_errors() -> tuple:
+    # The SDK is imported on the first call rather than at startup; see LLMClient.client.
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    )
+
+
+class LLMUnavailableError(Exception):
+    """The LLM could not be reached after all retries. Callers should fail the file, not guess."""
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute` / 60 units per second up to `per_minute`."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> float:
+        """Waits until `amount` units are available and takes them. Returns seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return waited
+            delay = (amount - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+    def adjust(self, delta: float) -> None:
+        """Takes (positive) or returns (negative) units after the fact; may go into debt."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def _estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    chars = sum(len(str(m.get("content") or "")) for m in kwargs.get("messages", []))
+    return chars // _CHARS_PER_TOKEN + (kwargs.get("max_tokens") or _EXPECTED_COMPLETION_TOKENS)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """The single path for chat completions: rate limits, bounded concurrency, retries, usage metrics.
+
+    Point OPENAI_BASE_URL at any OpenAI-compatible server (e.g. a local fake) to test it offline.
+    """
+
+    def __init__(self):
+        self._client: Optional["AsyncOpenAI"] = None
+        self._requests = TokenBucket(LLM_REQUESTS_PER_MINUTE)
+        self._tokens = TokenBucket(LLM_TOKENS_PER_MINUTE)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Call, retry and token counts for the benchmarks; /metrics serves the same from src/metrics.py.
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """Built, and the openai SDK imported, on first use or by the startup warm-up."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            # Retries are ours; the SDK's own would bypass the limiter and metrics.
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                timeout=LLM_TIMEOUT_SECONDS,
+                max_retries=0,
+            )
+        return self._client
+
+    def _concurrency(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+            self._loop = loop
+        return self._semaphore
+
+    async def chat(self, purpose: str = "other", **kwargs):
+        """chat.completions.create with retries. `purpose` labels the call in usage metrics.
+
+        Raises LLMUnavailableError once retryable errors persist past LLM_MAX_RETRIES;
+        other API errors (bad request, auth) are raised immediately.
+        """
+        import openai
+        retryable = retryable_errors()
+        estimated = _estimate_tokens(kwargs)
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._requests.acquire(1)
+            await self._tokens.acquire(estimated)
+            try:
+                async with self._concurrency():
+                    # Timed inside the semaphore: latency is the API's, not the queue's.
+                    start = time.perf_counter()
+                    response = await self.client.chat.completions.create(**kwargs)
+                    latency = time.perf_counter() - start
+            except retryable as e:
+                # The failed attempt used none of its token estimate; the retry takes it again.
+                self._tokens.adjust(-estimated)
+                self.counters[f"{purpose}.errors"] += 1
+                if isinstance(e, openai.RateLimitError):
+                    self.counters["rate_limited"] += 1
+                if attempt == LLM_MAX_RETRIES:
+                    LLM_REQUESTS.inc(purpose, "failed")
+                    raise LLMUnavailableError(f"{purpose}: {type(e).__name__} after {attempt + 1} attempts: {e}") from e
+                # Full jitter; a server-provided Retry-After wins when longer.
+                delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                delay = max(delay, _retry_after(e) or 0.0)
+                self.counters["retries"] += 1
+                LLM_REQUESTS.inc(purpose, "retried")
+                logger.warning("LLM %s call failed (%s), retry %d in %.1fs", purpose, type(e).__name__, attempt + 1, delay)
+                await asyncio.sleep(delay)
+                continue
+            except openai.APIError:
+                self._tokens.adjust(-estimated)
+                self.counters[f"{purpose}.errors"] += 1
+                LLM_REQUESTS.inc(purpose, "failed")
+                raise
+
+            self.counters[f"{purpose}.calls"] += 1
+            self.counters[f"{kwargs.get('model')}.calls"] += 1
+            LLM_REQUESTS.inc(purpose, "ok")
+            LLM_SECONDS.observe(latency, purpose, str(kwargs.get("model", "")))
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.counters["prompt_tokens"] += usage.prompt_tokens or 0
+                self.counters["completion_tokens"] += usage.completion_tokens or 0
+                LLM_TOKENS.inc("prompt", amount=usage.prompt_tokens or 0)
+                LLM_TOKENS.inc("completion", amount=usage.completion_tokens or 0)
+                self._tokens.adjust((usage.total_tokens or 0) - estimated)
+            return response
+
+
+llm_client = LLMClient()
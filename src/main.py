@@ -1,17 +1,64 @@
 # src/main.py
 
+from dotenv import load_dotenv
+
+# Settings are read from the environment at import time, so load .env first.
+load_dotenv()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from typing import List
-import uvicorn
+import asyncio
+import json
+import logging
+import os
 
-from src.pipeline import run_pipeline
+# DEBUG adds per-claim data and the OCR'd header text; WARNING keeps only problems.
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+from src.executor import shutdown_extraction_executor
+from src.ingest import PDFSource, UploadTooLarge, discard, ingest_uploads
+from src.jobs import job_pool, job_store
+from src.metrics import registry
+from src.pipeline import run_pipeline, stream_pipeline
 from src.schemas import BatchClaimResponse
+from src.warmup import WARMUP_ON_STARTUP, warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importing the app loads neither the graph, the LLM client, the gazetteer nor the
+    # PDF/OCR libraries; warm-up loads them in the background while the server comes up.
+    job_pool.start()
+    if WARMUP_ON_STARTUP:
+        warmup.start()
+    yield
+    await warmup.stop()
+    await job_pool.stop()
+    shutdown_extraction_executor()
+
 
 app = FastAPI(
     title="HealthPay Batch Claim Processor",
-    description="An AI pipeline to process batches of medical insurance claim documents."
+    description="An AI pipeline to process batches of medical insurance claim documents.",
+    lifespan=lifespan
 )
 
+
+async def read_uploads(files: List[UploadFile]) -> List[PDFSource]:
+    """Spools (or reads, in INGEST_MODE "memory") the uploads; the caller discards them when done."""
+    try:
+        return await ingest_uploads(files)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
 @app.post("/process-claim-batch", response_model=BatchClaimResponse)
 async def process_claim_batch(files: List[UploadFile] = File(...)):
     """
@@ -21,29 +68,118 @@ async def process_claim_batch(files: List[UploadFile] = File(...)):
     if not files:
         raise HTTPException(status_code=400, detail="No files were uploaded.")
 
+    logger.info("Received %d files", len(files))
+    files_data = await read_uploads(files)
     try:
-        print(f"[INFO] Received {len(files)} files")
-        files_data = [await file.read() for file in files]
         filenames = [file.filename for file in files]
 
         for i, fname in enumerate(filenames):
-            print(f"--- File {i + 1}/{len(filenames)}: {fname} ---")
+            logger.debug("File %d/%d: %s", i + 1, len(filenames), fname)
 
         result = await run_pipeline(files_data, filenames)
 
         if not result.processed_claims:
-            print("[WARN] run_pipeline returned an empty processed_claims list.")
+            logger.warning("run_pipeline returned an empty processed_claims list.")
         else:
             for claim in result.processed_claims:
-                print("[SUCCESS] Processed claim:", claim.document_data)
+                logger.debug("Processed claim: %s", claim.document_data)
 
         return result
 
     except Exception as e:
-        import traceback
-        print(f"[CRITICAL] Unhandled exception: {e}")
-        traceback.print_exc()
+        logger.exception("Unhandled exception: %s", e)
         raise HTTPException(status_code=500, detail="An internal error occurred during claim processing.")
+    finally:
+        discard(files_data)
+
+@app.post("/process-claim-batch/stream")
+async def process_claim_batch_stream(files: List[UploadFile] = File(...)):
+    """
+    Same as /process-claim-batch, but streams NDJSON events: one "file_extracted"
+    line per file, one "claim_result" line per claim, then "batch_complete".
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files were uploaded.")
+
+    logger.info("Received %d files (streaming)", len(files))
+    # Read uploads before streaming starts; FastAPI closes them once the handler returns.
+    files_data = await read_uploads(files)
+    filenames = [file.filename for file in files]
+
+    async def ndjson_events():
+        try:
+            async for event in stream_pipeline(files_data, filenames):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.exception("Unhandled exception while streaming: %s", e)
+            yield json.dumps({"event": "error", "detail": "An internal error occurred during claim processing."}) + "\n"
+
+    # Cleanup runs after the response, including when the client left before the body was iterated.
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson",
+                             background=BackgroundTask(discard, files_data))
+
+@app.post("/jobs", status_code=202)
+async def submit_job(files: List[UploadFile] = File(...)):
+    """
+    Queues a batch for background processing and returns its job id immediately.
+    Poll GET /jobs/{job_id} for progress and fetch GET /jobs/{job_id}/result when completed.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files were uploaded.")
+
+    files_data = await read_uploads(files)
+    filenames = [file.filename for file in files]
+    try:
+        job_id = await asyncio.to_thread(job_store.submit, files_data, filenames)
+    finally:
+        discard(files_data)
+    job_pool.notify()
+    logger.info("Queued job %s with %d files", job_id, len(files))
+    return {"job_id": job_id, "status": "queued", "files": len(files)}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    status = await asyncio.to_thread(job_store.status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return status
+
+
+@app.get("/jobs/{job_id}/result", response_model=BatchClaimResponse)
+async def get_job_result(job_id: str):
+    status = await asyncio.to_thread(job_store.status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    if status["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {status['error']}")
+    if status["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}.")
+    result = await asyncio.to_thread(job_store.result, job_id)
+    return Response(content=result, media_type="application/json")
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once warm-up has finished (immediately when WARMUP_ON_STARTUP
+    is off), 503 while it is running or after it failed."""
+    status = warmup.status()
+    status["ready"] = warmup.done or not WARMUP_ON_STARTUP
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.post("/warmup")
+async def run_warmup():
+    """Runs warm-up now, or waits for the one in progress, and returns its step timings in seconds."""
+    try:
+        return await warmup.run()
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail=warmup.status())
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage timing histograms and pipeline counters in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,174 @@
+# src/metrics.py
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Histogram bucket upper bounds in seconds; stages range from sub-millisecond
+# (classification, validation) to minutes (OCR of long scans, retried LLM calls).
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Observations bucketed by upper bound, with their count and sum, per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: [count per bucket (+Inf last), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    """Metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "claim_stage_seconds", "Wall time of each pipeline stage.", ["stage"]))
+STAGE_ERRORS = registry.register(Counter(
+    "claim_stage_errors_total", "Pipeline stages that raised.", ["stage"]))
+TEXT_PATHS = registry.register(Counter(
+    "claim_text_extraction_total",
+    "Files by how their text was obtained: text_layer, mixed (some pages OCR'd), ocr, or cache.", ["path"]))
+PAGES = registry.register(Counter(
+    "claim_pages_total", "Pages by text source: text_layer or ocr.", ["source"]))
+CLASSIFICATIONS = registry.register(Counter(
+    "claim_classifications_total", "Documents classified, by deciding classifier (local or llm).", ["classifier"]))
+FALLBACKS = registry.register(Counter(
+    "claim_fallbacks_total", "Regex/OCR fallback lookups for fields the LLM left empty.", ["field", "result"]))
+LLM_REQUESTS = registry.register(Counter(
+    "claim_llm_requests_total", "LLM requests by purpose and outcome (ok, retried, failed).", ["purpose", "outcome"]))
+LLM_SECONDS = registry.register(Histogram(
+    "claim_llm_request_seconds", "Latency of successful LLM requests, by purpose and model tier.", ["purpose", "model"]))
+LLM_TOKENS = registry.register(Counter(
+    "claim_llm_tokens_total", "LLM tokens reported by the API.", ["kind"]))
+ROUTING = registry.register(Counter(
+    "claim_llm_routing_total",
+    "LLM calls by the tier that settled them: fast, escalated (whole document), escalated_fields, "
+    "or large (routing off).", ["purpose", "outcome"]))
+FILES = registry.register(Counter(
+    "claim_files_total", "Files processed by the pipeline, by outcome (ok or error).", ["outcome"]))
+CACHE_LOOKUPS = registry.register(Counter(
+    "claim_cache_lookups_total", "Cache lookups by cache (text_cache or llm_cache) and result: memory_hit, disk_hit or miss.",
+    ["cache", "result"]))
+CACHE_EVICTIONS = registry.register(Counter(
+    "claim_cache_evictions_total", "Cache entries dropped, by cache, tier (memory or disk) and reason (size or expired).",
+    ["cache", "tier", "reason"]))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times the enclosed block as `name` in claim_stage_seconds; counts it in claim_stage_errors_total if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, name)
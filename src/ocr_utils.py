@@ -1,18 +1,30 @@
-import pytesseract
-from pdf2image import convert_from_path
+import logging
+import os
 
-POPPLER_PATH = r"C:\poppler\Library\bin"
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+from src.gazetteer import hospital_gazetteer
+
+logger = logging.getLogger(__name__)
+
+POPPLER_PATH = os.getenv("POPPLER_PATH") or (r"C:\poppler\Library\bin" if os.name == "nt" else None)
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or (r"C:\Program Files\Tesseract-OCR\tesseract.exe" if os.name == "nt" else None)
 
 def extract_hospital_name_from_pdf_header(pdf_path: str) -> str:
     try:
+        # Imported here so loading this module doesn't pull in the OCR libraries.
+        import pytesseract
+        from pdf2image import convert_from_path
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
         images = convert_from_path(pdf_path, first_page=1, last_page=1, poppler_path=POPPLER_PATH)
         if images:
             ocr_text = pytesseract.image_to_string(images[0])
+            match = hospital_gazetteer.match(ocr_text, fuzzy=True)
+            if match:
+                return match.name
             for line in ocr_text.splitlines():
                 if "hospital" in line.lower() or "clinic" in line.lower():
                     return line.strip()
         return None
     except Exception as e:
-        print(f"[OCR HEADER ERROR] {e}")
+        logger.error("OCR header extraction failed: %s", e)
         return None
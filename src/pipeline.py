@@ -1,18 +1,46 @@
 # src/pipeline.py
 
-from typing import List, TypedDict, Dict
-from langgraph.graph import StateGraph, END
-from collections import defaultdict
-
-from src.agents import classify_document, targeted_extraction_agent, validation_agent
+import asyncio
+import logging
+import os
+from functools import lru_cache
+from typing import AsyncIterator, Callable, List, Optional, Tuple, TypedDict, Dict
+
+from src.agents import (
+    classify_document, combined_extraction_agent, regex_first_extraction_agent, targeted_extraction_agent,
+)
+from src.checkpoints import DOC_TYPE, DOCUMENTS, TEXT, FileCheckpoint, batch_key, discard_batch, load_batch
+from src.classifier import CLASSIFIER_CONFIDENCE_THRESHOLD, classify_pages
+from src.context import DocumentIndex, select_classification_context, select_context
+from src.dedup import DEDUP_ENABLED, BatchDeduplicator, DuplicateLink, collapse_repeated_pages, fingerprint
+from src.executor import run_in_extraction_pool
+from src.grouping import group_documents
+from src.ingest import MB, REQUEST_MEMORY_BUDGET_MB, MemoryBudget, PDFSource, process_budget, source_size
+from src.metrics import CLASSIFICATIONS, FILES, stage
 from src.utils import extract_text_from_pdf_by_page
-from src.schemas import BatchClaimResponse, ClaimResult, InitialExtraction, ConsolidatedClaimData, Bill, DischargeSummary, IDCard
+from src.validation import validate_claims
+from src.schemas import (
+    BatchClaimResponse, ClaimResult, InitialExtraction, ConsolidatedClaimData, Bill, DischargeSummary, IDCard, Validation,
+    DuplicateFile,
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 class GraphState(TypedDict):
-    files_data: List[bytes]
+    # Raw PDFs, or SpooledPDFs pointing at uploads on disk (src/ingest.py).
+    files_data: List[PDFSource]
     filenames: List[str]
+    # Documents already extracted for some file indices (e.g. a resumed job); those files are skipped.
+    completed_extractions: Dict[int, List[InitialExtraction]]
+    # Key of the batch's checkpoints (src/checkpoints.py); derived from the files when not given.
+    batch_id: Optional[str]
     initial_extractions: List[InitialExtraction]
+    # Indices of files that still failed after FILE_MAX_ATTEMPTS; their checkpoints are kept.
+    failed_files: List[int]
+    # Files that were near-duplicates of another file in the batch and reused its extraction.
+    duplicates: List[DuplicateFile]
     batch_results: List[ClaimResult]
 
 
@@ -22,93 +50,390 @@ MODEL_MAP = {
     "id_card": IDCard
 }
 
-
-async def initial_extraction_node(state: GraphState):
-    """Node 1: Performs targeted extraction and returns a list of Pydantic objects."""
-    print("--- Node 1: Targeted Extraction ---")
-    all_docs = []
-
-    for i, file_bytes in enumerate(state['files_data']):
-        filename = state['filenames'][i]
-        full_text = "\n".join(extract_text_from_pdf_by_page(file_bytes))
-
-        doc_type = await classify_document(full_text, filename)
-        # Force classification to consolidated_claim if needed
+# Document models by class name, as reported in "file_extracted" stream events.
+DOCUMENT_MODELS = {model.__name__: model for model in (Bill, DischargeSummary, IDCard)}
+
+# Concurrency limits for Node 1. Setting both to 1 reproduces the old
+# one-file-at-a-time, one-call-at-a-time behaviour.
+MAX_CONCURRENT_FILES = int(os.getenv("MAX_CONCURRENT_FILES", "8"))
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "16"))
+
+# Treat every file as a consolidated claim (bill + discharge summary), as the
+# pipeline always has. Set to false to act on the classifier's document type.
+FORCE_CONSOLIDATED_CLAIM = os.getenv("FORCE_CONSOLIDATED_CLAIM", "true").lower() == "true"
+
+# How documents are extracted: "combined" sends a consolidated claim once with a
+# schema covering every document type; "per_schema" makes one call per document type;
+# "regex_first" extracts each document type locally and calls the LLM only for
+# fields that are missing or low-confidence.
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "combined")
+
+# A file that raises or takes longer than FILE_TIMEOUT_SECONDS (0 = no limit) is retried
+# up to FILE_MAX_ATTEMPTS times in total, resuming from its last checkpointed stage.
+FILE_MAX_ATTEMPTS = int(os.getenv("FILE_MAX_ATTEMPTS", "2"))
+FILE_TIMEOUT_SECONDS = float(os.getenv("FILE_TIMEOUT_SECONDS", "600"))
+
+
+class _CanonicalPending(Exception):
+    """Raised by _extract_file for a near-duplicate whose canonical file is still being extracted."""
+
+    def __init__(self, link: DuplicateLink):
+        super().__init__(f"waiting for '{link.canonical_filename}'")
+        self.link = link
+
+
+async def _limited(semaphore: asyncio.Semaphore, coro):
+    """Awaits `coro` while holding a slot of `semaphore`."""
+    async with semaphore:
+        return await coro
+
+
+async def _timed(name: str, coro):
+    """Awaits `coro` as pipeline stage `name` (see src/metrics.py)."""
+    with stage(name):
+        return await coro
+
+
+def _duplicate_file(link: DuplicateLink) -> DuplicateFile:
+    return DuplicateFile(filename=link.filename, duplicate_of=link.canonical_filename, match=link.match,
+                         similarity=link.similarity)
+
+
+async def _reuse_duplicate(
+    link: DuplicateLink, dedup: BatchDeduplicator, text_by_page: List[str]
+) -> Optional[Tuple[List[InitialExtraction], List[Dict[str, str]]]]:
+    """The canonical file's documents for a near-duplicate, or None if the canonical failed.
+
+    A file contained in a larger one (a discharge summary also sent inside a consolidated
+    claim) takes only the canonical documents of its own locally classified type.
+    """
+    reused = await dedup.wait(link)
+    if reused is None:
+        logger.info("Canonical file '%s' failed; extracting '%s' itself", link.canonical_filename, link.filename)
+        return None
+    docs, sources = reused
+    if link.match == "contained":
+        own_type = MODEL_MAP.get(classify_pages(text_by_page).doc_type)
+        kept = [i for i, doc in enumerate(docs) if own_type is not None and isinstance(doc, own_type)]
+        if kept:
+            docs, sources = [docs[i] for i in kept], [sources[i] for i in kept]
+    logger.info("File '%s' is a near-%s of '%s' (similarity %.2f); reusing its %d document(s)",
+                link.filename, link.match, link.canonical_filename, link.similarity, len(docs))
+    return [doc.model_copy() for doc in docs], [dict(s) for s in sources]
+
+
+def _document_records(docs: List[InitialExtraction], sources: List[Dict[str, str]]) -> List[dict]:
+    """Documents as JSON-ready records, the shape used by "file_extracted" events and checkpoints."""
+    return [
+        {"document_type": type(doc).__name__, "data": doc.model_dump(), "field_sources": doc_sources}
+        for doc, doc_sources in zip(docs, sources)
+    ]
+
+
+async def _extract_file(
+    file_bytes: PDFSource, filename: str, llm_semaphore: asyncio.Semaphore, checkpoint: FileCheckpoint,
+    index: int = 0, dedup: Optional[BatchDeduplicator] = None,
+) -> Tuple[List[InitialExtraction], List[Dict[str, str]]]:
+    """Classifies and extracts a single file.
+
+    Returns the documents and, parallel to them, where each field came from
+    ("llm", "regex:<label>", "gazetteer" or "fallback"). The text, the classification
+    and the documents are checkpointed as they are produced; stages an earlier
+    attempt already checkpointed are not repeated. With a `dedup`, a near-duplicate
+    of another file in the batch reuses that file's documents (raising _CanonicalPending
+    while that file is still running), and pages repeated within the file are dropped
+    before anything reaches the LLM.
+    """
+    records = checkpoint.get(DOCUMENTS)
+    if records is not None:
+        logger.info("File '%s' restored from checkpoint", filename)
+        if dedup is not None and checkpoint.get(TEXT) is not None:
+            # Registered all the same: later near-duplicates still find it, and a restored copy stays linked.
+            with stage("dedup"):
+                fingerprints = await run_in_extraction_pool(fingerprint, checkpoint.get(TEXT))
+                link = dedup.register(index, filename, fingerprints)
+            if link is not None:
+                if not dedup.settled(link):
+                    raise _CanonicalPending(link)
+                # Unlinks it if the canonical failed this time, so its own documents are kept instead.
+                await dedup.wait(link)
+        return ([DOCUMENT_MODELS[r["document_type"]](**r["data"]) for r in records],
+                [r["field_sources"] for r in records])
+
+    text_by_page = checkpoint.get(TEXT)
+    if text_by_page is None:
+        text_by_page = await extract_text_from_pdf_by_page(file_bytes)
+        if any(text.strip() for text in text_by_page):
+            await checkpoint.save(TEXT, text_by_page)
+
+    if dedup is not None:
+        with stage("dedup"):
+            fingerprints = await run_in_extraction_pool(fingerprint, text_by_page)
+            link = dedup.register(index, filename, fingerprints)
+        if link is not None:
+            if not dedup.settled(link):
+                raise _CanonicalPending(link)
+            reused = await _reuse_duplicate(link, dedup, text_by_page)
+            if reused is not None:
+                await checkpoint.save(DOCUMENTS, _document_records(*reused))
+                return reused
+        unique_pages = collapse_repeated_pages(text_by_page, fingerprints.pages)
+        if len(unique_pages) < len(text_by_page):
+            logger.info("File '%s': %d repeated page(s) dropped", filename, len(text_by_page) - len(unique_pages))
+            text_by_page = unique_pages
+    full_text = "\n".join(text_by_page)
+    # Prompts get a token-budgeted selection of relevant sections; fallbacks still see full_text.
+    doc_index = DocumentIndex(text_by_page)
+
+    # Local keyword classification; the LLM is only consulted when it is unsure.
+    with stage("classification"):
+        classification = classify_pages(text_by_page)
+    if FORCE_CONSOLIDATED_CLAIM:
         doc_type = "consolidated_claim"
-
-        print(f"  -> File '{filename}' classified as '{doc_type}'")
-
-        extracted = []
-
-        if doc_type == "consolidated_claim":
-            print("  -> Extracting both bill and discharge_summary from consolidated_claim")
-            bill_model = await targeted_extraction_agent(full_text, Bill, "bill", file_bytes)
-            summary_model = await targeted_extraction_agent(full_text, DischargeSummary, "discharge_summary", file_bytes)
-
-            if bill_model:
-                extracted.append(bill_model)
-            if summary_model:
-                extracted.append(summary_model)
-
-        elif doc_type in MODEL_MAP:
-            model = MODEL_MAP[doc_type]
-            validated_doc = await targeted_extraction_agent(full_text, model, doc_type, file_bytes)
-
-            if validated_doc:
-                extracted.append(validated_doc)
-            else:
-                print(f"  -> WARNING: Extraction failed or returned invalid data for '{filename}'. Skipping.")
+    elif classification.confidence >= CLASSIFIER_CONFIDENCE_THRESHOLD:
+        doc_type = classification.doc_type
+        CLASSIFICATIONS.inc("local")
+    elif checkpoint.get(DOC_TYPE) is not None:
+        doc_type = checkpoint.get(DOC_TYPE)
+    else:
+        logger.info("Local classifier unsure (%.2f), asking LLM", classification.confidence)
+        doc_type = await _limited(llm_semaphore, _timed("llm_classification", classify_document(
+            full_text, filename, select_classification_context(doc_index))))
+        CLASSIFICATIONS.inc("llm")
+        await checkpoint.save(DOC_TYPE, doc_type)
+
+    logger.info("File '%s' classified as '%s' (local: '%s', confidence %.2f)",
+                filename, doc_type, classification.doc_type, classification.confidence)
+
+    extracted, sources = [], []
+    # Both targeted agents take the same arguments; regex_first only calls the LLM when needed.
+    agent = regex_first_extraction_agent if EXTRACTION_MODE == "regex_first" else targeted_extraction_agent
+
+    if doc_type == "consolidated_claim" and EXTRACTION_MODE == "combined":
+        logger.debug("Extracting bill, discharge_summary and id_card from consolidated_claim in one call")
+        extracted.extend(await _limited(llm_semaphore, _timed("extraction_combined", combined_extraction_agent(
+            full_text, file_bytes, select_context(doc_index, "combined"), sources))))
+
+    elif doc_type == "consolidated_claim":
+        logger.debug("Extracting both bill and discharge_summary from consolidated_claim")
+        # Each prompt sees only its routed pages; the fallbacks still search the whole file.
+        bill_pages = classification.pages_for("bill", text_by_page)
+        summary_pages = classification.pages_for("discharge_summary", text_by_page)
+        bill_sources, summary_sources = {}, {}
+        bill_model, summary_model = await asyncio.gather(
+            _limited(llm_semaphore, _timed("extraction_bill", agent(
+                full_text, Bill, "bill", file_bytes,
+                select_context(DocumentIndex(bill_pages), "bill"), bill_sources))),
+            _limited(llm_semaphore, _timed("extraction_discharge_summary", agent(
+                full_text, DischargeSummary, "discharge_summary", file_bytes,
+                select_context(DocumentIndex(summary_pages), "discharge_summary"), summary_sources))),
+        )
+
+        if bill_model:
+            extracted.append(bill_model)
+            sources.append(bill_sources)
+        if summary_model:
+            extracted.append(summary_model)
+            sources.append(summary_sources)
+
+    elif doc_type in MODEL_MAP:
+        model = MODEL_MAP[doc_type]
+        doc_sources = {}
+        validated_doc = await _limited(llm_semaphore, _timed(f"extraction_{doc_type}", agent(
+            full_text, model, doc_type, file_bytes, select_context(doc_index, doc_type), doc_sources)))
+
+        if validated_doc:
+            extracted.append(validated_doc)
+            sources.append(doc_sources)
         else:
-            print(f"  -> Skipping unsupported document type: '{doc_type}'")
+            logger.warning("Extraction failed or returned invalid data for '%s'. Skipping.", filename)
+    else:
+        logger.warning("Skipping unsupported document type: '%s'", doc_type)
+
+    await checkpoint.save(DOCUMENTS, _document_records(extracted, sources))
+    return extracted, sources
+
+
+async def _extract_and_report(
+    index: int,
+    file_bytes: PDFSource,
+    filename: str,
+    file_semaphore: asyncio.Semaphore,
+    llm_semaphore: asyncio.Semaphore,
+    request_budget: MemoryBudget,
+    writer: Callable[[dict], None],
+    checkpoint: FileCheckpoint,
+    dedup: Optional[BatchDeduplicator] = None,
+) -> Tuple[List[InitialExtraction], Optional[str]]:
+    """Runs _extract_file, retrying failures and timeouts, and reports the outcome.
+
+    A near-duplicate waits for its canonical file between attempts, not against its own
+    FILE_TIMEOUT_SECONDS, so a slow canonical that succeeds is never a failure here.
+
+    The file's size is held against the batch's and the process's memory budgets while
+    it is extracted. Returns the documents and the last error (None on success). Never
+    raises, so one bad file can't sink the batch.
+    """
+    docs, sources, error = [], [], None
+    size = source_size(file_bytes)
+    result = None
+    try:
+        async with file_semaphore, request_budget.reserve(size), process_budget.reserve(size):
+            for attempt in range(1, FILE_MAX_ATTEMPTS + 1):
+                try:
+                    with stage("file"):
+                        while True:
+                            try:
+                                docs, sources = await asyncio.wait_for(
+                                    _extract_file(file_bytes, filename, llm_semaphore, checkpoint, index, dedup),
+                                    FILE_TIMEOUT_SECONDS or None,
+                                )
+                                break
+                            except _CanonicalPending as pending:
+                                # Waited for outside this file's timeout: the canonical file runs to its
+                                # own deadline, then this attempt starts over and takes its documents.
+                                await dedup.until_settled(pending.link)
+                    error = None
+                    break
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                    logger.error("Extraction failed for '%s' (attempt %d/%d): %s",
+                                 filename, attempt, FILE_MAX_ATTEMPTS, error)
+        if error is None:
+            result = (docs, sources)
+    finally:
+        # Near-duplicates waiting on this file get its documents, or extract themselves if it failed.
+        if dedup is not None:
+            dedup.resolve(index, result)
+    FILES.inc("error" if error else "ok")
+    link = dedup.links.get(index) if dedup is not None else None
+    writer({
+        "event": "file_extracted",
+        "index": index,
+        "filename": filename,
+        "documents": _document_records(docs, sources),
+        "error": error,
+        "duplicate": _duplicate_file(link).model_dump() if link else None,
+    })
+    return docs, error
 
-        all_docs.extend(extracted)
 
-    return {"initial_extractions": all_docs}
+async def initial_extraction_node(state: GraphState):
+    """Node 1: Performs targeted extraction and returns a list of Pydantic objects.
+
+    Files are processed concurrently (bounded by MAX_CONCURRENT_FILES) and every
+    LLM call shares a MAX_CONCURRENT_LLM_CALLS budget. Results keep input order;
+    a "file_extracted" stream event is emitted as each file finishes. Files that are
+    near-duplicates of another file in the batch are extracted once (src/dedup.py);
+    larger files start first so they become the canonical copy of the pages they share.
+    """
+    logger.info("Node 1: Targeted Extraction")
+    file_semaphore = asyncio.Semaphore(MAX_CONCURRENT_FILES)
+    llm_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+    request_budget = MemoryBudget(REQUEST_MEMORY_BUDGET_MB * MB)
+    from langgraph.config import get_stream_writer
+    writer = get_stream_writer()
+    dedup = BatchDeduplicator() if DEDUP_ENABLED else None
+    completed = state.get('completed_extractions') or {}
+    batch = state.get('batch_id') or batch_key(state['files_data'], state['filenames'])
+    checkpoints = await load_batch(batch, len(state['files_data']))
+
+    pending = [i for i in range(len(state['files_data'])) if i not in completed]
+    if dedup is not None:
+        pending.sort(key=lambda i: -source_size(state['files_data'][i]))
+    if completed:
+        logger.info("Reusing extractions for %d file(s), extracting %d", len(completed), len(pending))
+    restored = sum(DOCUMENTS in checkpoints[i].stages for i in pending)
+    if restored:
+        logger.info("Resuming batch %s: %d file(s) restored from checkpoints", batch, restored)
+    extracted = await asyncio.gather(*(
+        _extract_and_report(i, state['files_data'][i], state['filenames'][i], file_semaphore, llm_semaphore,
+                            request_budget, writer, checkpoints[i], dedup)
+        for i in pending
+    ))
+    per_file = {**completed, **{i: docs for i, (docs, _) in zip(pending, extracted)}}
+    failed = [i for i, (_, error) in zip(pending, extracted) if error]
+
+    # A duplicate's documents are copies of its canonical file's; they are linked, not merged twice.
+    links = dedup.links if dedup is not None else {}
+    if links:
+        logger.info("%d near-duplicate file(s) reused another file's extraction", len(links))
+    all_docs = [doc for i in sorted(per_file) if i not in links for doc in per_file[i]]
+    return {"initial_extractions": all_docs, "failed_files": failed, "batch_id": batch,
+            "duplicates": [_duplicate_file(links[i]) for i in sorted(links)]}
+
+
+def consolidate_documents(docs: List[InitialExtraction]) -> ConsolidatedClaimData:
+    """Merges one claim group's documents; the first non-null value of each field wins."""
+    data = ConsolidatedClaimData()
+    for doc in docs:
+        doc_dict = doc.model_dump()
+        for key, value in doc_dict.items():
+            if value and getattr(data, key) is None:
+                setattr(data, key, value)
+    return data
+
+
+def build_claim_result(identifier: str, data: ConsolidatedClaimData, validation_results: Validation) -> ClaimResult:
+    logger.debug("Processing claim for: %s", identifier)
+    if validation_results.missing_fields or validation_results.discrepancies:
+        status, reason = "rejected", "Claim failed validation due to missing fields or discrepancies."
+    else:
+        status, reason = "approved", "All required data is present and consistent."
+
+    return ClaimResult(
+        claim_identifier=identifier,
+        document_data=data,
+        validation=validation_results,
+        claim_decision={"status": status, "reason": reason}
+    )
 
 
 async def validate_node(state: GraphState):
-    """Node 2: Validates documents independently and builds claim results."""
-    print("\n--- Node 2: Validating Individually Extracted Claims ---")
+    """Node 2: Validates documents independently and builds claim results.
+
+    Each ClaimResult is also emitted as a "claim_result" stream event as soon as it is built.
+    """
+    logger.info("Node 2: Validating Individually Extracted Claims")
     initial_extractions = state['initial_extractions']
 
     if not initial_extractions:
-        print("  -> No valid documents were extracted. Ending pipeline.")
+        logger.warning("No valid documents were extracted. Ending pipeline.")
+        await _finish_batch(state)
         return {"batch_results": []}
 
-    claim_groups = defaultdict(list)
-    for doc in initial_extractions:
-        if doc.patient_name:
-            claim_groups[doc.patient_name].append(doc)
+    # Normalized names plus policy / hospital-and-date blocking; nameless documents are kept.
+    with stage("grouping"):
+        claim_groups = group_documents(initial_extractions)
+    logger.info("Grouped %d document(s) into %d claim(s)", len(initial_extractions), len(claim_groups))
 
-    final_results = []
-    for identifier, docs in claim_groups.items():
-        print(f"\n--- Processing Claim for: {identifier} ---")
-
-        data = ConsolidatedClaimData()
-        for doc in docs:
-            doc_dict = doc.model_dump()
-            for key, value in doc_dict.items():
-                if value and getattr(data, key) is None:
-                    setattr(data, key, value)
+    # All claims are validated in one columnar pass over the batch.
+    with stage("validation"):
+        claims = [consolidate_documents(docs) for _, docs in claim_groups]
+        validations = validate_claims(claims)
 
-        validation_results = await validation_agent(data)
+    from langgraph.config import get_stream_writer
+    writer = get_stream_writer()
+    final_results = []
+    for (identifier, _), data, validation in zip(claim_groups, claims, validations):
+        result = build_claim_result(identifier, data, validation)
+        writer({"event": "claim_result", "claim": result.model_dump()})
+        final_results.append(result)
 
-        if validation_results.missing_fields or validation_results.discrepancies:
-            status, reason = "rejected", "Claim failed validation due to missing fields or discrepancies."
-        else:
-            status, reason = "approved", "All required data is present and consistent."
+    await _finish_batch(state)
+    return {"batch_results": final_results}
 
-        final_results.append(ClaimResult(
-            claim_identifier=identifier,
-            document_data=data,
-            validation=validation_results,
-            claim_decision={"status": status, "reason": reason}
-        ))
 
-    return {"batch_results": final_results}
+async def _finish_batch(state: GraphState) -> None:
+    """Drops the batch's checkpoints once every file succeeded; failed files keep theirs for a resubmission."""
+    if state.get('failed_files'):
+        logger.warning("%d file(s) failed; checkpoints kept for batch %s", len(state['failed_files']), state['batch_id'])
+    elif state.get('batch_id'):
+        await discard_batch(state['batch_id'])
 
 
 def build_graph():
+    from langgraph.graph import StateGraph, END
     workflow = StateGraph(GraphState)
     workflow.add_node("initial_extraction", initial_extraction_node)
     workflow.add_node("validate", validate_node)
@@ -118,10 +443,46 @@ def build_graph():
     return workflow.compile()
 
 
-graph = build_graph()
-
-
-async def run_pipeline(files_data: List[bytes], filenames: List[str]) -> BatchClaimResponse:
-    initial_state = {"files_data": files_data, "filenames": filenames}
-    final_state = await graph.ainvoke(initial_state)
-    return BatchClaimResponse(processed_claims=final_state.get('batch_results', []))
+@lru_cache(maxsize=None)
+def get_graph():
+    """The compiled graph. langgraph is imported and the graph compiled on the first
+    batch, or earlier by the startup warm-up (src/warmup.py), not when this module loads."""
+    return build_graph()
+
+
+async def run_pipeline(
+    files_data: List[PDFSource],
+    filenames: List[str],
+    completed_extractions: Optional[Dict[int, List[InitialExtraction]]] = None,
+    batch_id: Optional[str] = None,
+) -> BatchClaimResponse:
+    """Runs the pipeline to completion. Re-running a batch that failed part-way resumes it
+    from its checkpoints; pass `batch_id` when the file list itself changes between runs."""
+    initial_state = {"files_data": files_data, "filenames": filenames,
+                     "completed_extractions": completed_extractions or {}, "batch_id": batch_id}
+    final_state = await get_graph().ainvoke(initial_state)
+    return BatchClaimResponse(processed_claims=final_state.get('batch_results', []),
+                              duplicates=final_state.get('duplicates', []))
+
+
+async def stream_pipeline(
+    files_data: List[PDFSource],
+    filenames: List[str],
+    completed_extractions: Optional[Dict[int, List[InitialExtraction]]] = None,
+    batch_id: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    """Runs the pipeline and yields events as they happen instead of one final response.
+
+    Yields "file_extracted" events from Node 1, "claim_result" events from Node 2,
+    and a closing "batch_complete" event with the number of claims. Files listed in
+    `completed_extractions` are not re-extracted and produce no "file_extracted" event;
+    `batch_id` works as in run_pipeline.
+    """
+    initial_state = {"files_data": files_data, "filenames": filenames,
+                     "completed_extractions": completed_extractions or {}, "batch_id": batch_id}
+    claims = 0
+    async for event in get_graph().astream(initial_state, stream_mode="custom"):
+        if event.get("event") == "claim_result":
+            claims += 1
+        yield event
+    yield {"event": "batch_complete", "claims": claims}
@@ -10,6 +10,26 @@ Here are the definitions for each document type:
 Analyze the user's text and respond with ONLY one of the following lowercase strings: 'bill', 'discharge_summary', 'id_card', 'other'.
 """
 
+# Weighted keyword terms for the local classifier (src/classifier.py). These mirror
+# the definitions in CLASSIFIER_PROMPT above; keep the two in sync.
+CLASSIFIER_KEYWORDS = {
+    "bill": {
+        "invoice": 2.0, "bill": 1.0, "bill no": 2.5, "bill date": 2.5, "charges": 1.5,
+        "total amount due": 3.0, "payment": 1.0, "amount paid": 2.5, "grand total": 3.0,
+        "net payable": 3.0, "gst": 1.0, "rate": 0.5, "qty": 1.0, "amount": 0.5,
+    },
+    "discharge_summary": {
+        "discharge summary": 4.0, "clinical summary": 3.0, "admission date": 2.0,
+        "date of admission": 2.0, "discharge date": 2.0, "diagnosis": 2.0, "final diagnosis": 3.0,
+        "history of present illness": 3.0, "procedures performed": 2.5, "chief complaints": 2.0,
+        "course in hospital": 2.5, "condition at discharge": 2.5, "advice on discharge": 2.5,
+    },
+    "id_card": {
+        "policy number": 2.0, "member id": 3.0, "group number": 3.0, "valid upto": 2.0,
+        "tpa": 1.5, "e-card": 3.0, "health card": 3.0,
+    },
+}
+
 EXTRACTOR_SYSTEM_PROMPT = """You are a highly accurate data extraction assistant. Extract the required information from the user's text and format it using the provided tool.
     
 **CRITICAL INSTRUCTIONS:**
@@ -0,0 +1,95 @@
+# src/routing.py
+
+import os
+import re
+from typing import List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from src.field_extraction import normalize_date
+from src.validation import POLICY_ID_PATTERN
+
+# Model tiers. Every LLM call goes to OPENAI_FAST_MODEL first and is escalated to
+# OPENAI_MODEL only when its answer fails implausible_fields(). An empty
+# OPENAI_FAST_MODEL sends everything straight to OPENAI_MODEL, as before.
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini")
+
+_POLICY_ID = re.compile(POLICY_ID_PATTERN, re.IGNORECASE)
+_DATE_FIELDS = ("admission_date", "discharge_date", "date_of_service")
+
+
+def tiered() -> bool:
+    return bool(OPENAI_FAST_MODEL) and OPENAI_FAST_MODEL != OPENAI_MODEL
+
+
+def _implausible(data: dict) -> List[str]:
+    """Fields of one flat document whose value can't be right. Nulls pass: fallbacks fill those."""
+    failing = []
+    dates = {}
+    for field in _DATE_FIELDS:
+        value = data.get(field)
+        if value is None:
+            continue
+        dates[field] = normalize_date(str(value))
+        if dates[field] is None:
+            failing.append(field)
+    if dates.get("admission_date") and dates.get("discharge_date") and dates["admission_date"] > dates["discharge_date"]:
+        failing += [field for field in ("admission_date", "discharge_date") if field not in failing]
+    amount = data.get("total_amount")
+    if amount is not None and not _positive(amount):
+        failing.append("total_amount")
+    policy_id = data.get("policy_id")
+    if policy_id is not None and not _POLICY_ID.fullmatch(str(policy_id).strip()):
+        failing.append("policy_id")
+    for field in ("patient_name", "hospital_name", "diagnosis"):
+        value = data.get(field)
+        if value is not None and not (isinstance(value, str) and value.strip()):
+            failing.append(field)
+    return failing
+
+
+def _positive(value) -> bool:
+    try:
+        return float(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def implausible_fields(data: Optional[dict], model: Type[BaseModel]) -> List[str]:
+    """Top-level fields of `model` that a cheaper model's answer got wrong.
+
+    A field fails when it is absent from the answer, fails `model`'s schema, or holds
+    an implausible value: a date that doesn't parse (or an admission after discharge),
+    a total that isn't positive, a policy ID outside POLICY_ID_PATTERN. Nested document
+    fields (CombinedClaimExtraction) fail as a whole when any of their own fields fail.
+    """
+    if not isinstance(data, dict):
+        return list(model.model_fields)
+    failing = [field for field in model.model_fields if field not in data]
+    try:
+        model(**data)
+    except ValidationError as e:
+        failing += [str(error["loc"][0]) for error in e.errors() if error["loc"]]
+    except TypeError:
+        return list(model.model_fields)
+
+    nested = False
+    for field, info in model.model_fields.items():
+        if _document_model(info.annotation) is None:
+            continue
+        nested = True
+        value = data.get(field)
+        if isinstance(value, dict) and _implausible(value):
+            failing.append(field)
+    if not nested:
+        failing += _implausible(data)
+    return [field for field in model.model_fields if field in failing]
+
+
+def _document_model(annotation) -> Optional[Type[BaseModel]]:
+    """The BaseModel inside Optional[...], if the field holds a nested document."""
+    for candidate in (annotation, *getattr(annotation, "__args__", ())):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
@@ -26,6 +26,12 @@ class IDCard(BaseModel):
 
 InitialExtraction = Union[Bill, DischargeSummary, IDCard]
 
+# Single-call extraction of every document type found in a consolidated claim.
+class CombinedClaimExtraction(BaseModel):
+    bill: Optional[Bill] = None
+    discharge_summary: Optional[DischargeSummary] = None
+    id_card: Optional[IDCard] = None
+
 # --- Final Consolidated Model (remains the same) ---
 class ConsolidatedClaimData(BaseModel):
     hospital_name: Optional[str] = None
@@ -52,5 +58,13 @@ class ClaimResult(BaseModel):
     validation: Validation
     claim_decision: ClaimDecision
 
+# A file whose text matched another file in the batch; its claim data comes from that file.
+class DuplicateFile(BaseModel):
+    filename: str
+    duplicate_of: str
+    match: str  # "duplicate" (same document) or "contained" (all its pages are in duplicate_of)
+    similarity: float  # share of word trigrams in common, 1.0 = identical text
+
 class BatchClaimResponse(BaseModel):
-    processed_claims: List[ClaimResult]
\ No newline at end of file
+    processed_claims: List[ClaimResult]
+    duplicates: List[DuplicateFile] = []
@@ -1,33 +1,308 @@
-from pdf2image import convert_from_bytes
-from PyPDF2 import PdfReader
-import pytesseract
+from typing import TYPE_CHECKING, Iterator, Optional
+import asyncio
 import io
-import pdfplumber  # ✅ newly added
+import logging
+import os
+import re
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-POPPLER_PATH = r"C:\poppler\poppler-24.08.0\Library\bin"
+from src.cache import make_key, text_cache
+from src.executor import run_in_extraction_pool
+from src.ingest import PDFSource, SpooledPDF, source_hash
+from src.metrics import PAGES, TEXT_PATHS, stage
 
+if TYPE_CHECKING:
+    import pymupdf
+    from PIL import Image
 
-def extract_text_from_pdf_by_page(file_bytes: bytes) -> list[str]:
+logger = logging.getLogger(__name__)
+
+# Tesseract and Poppler locations. On Linux/macOS both are found on PATH by default.
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or (r"C:\Program Files\Tesseract-OCR\tesseract.exe" if os.name == "nt" else None)
+POPPLER_PATH = os.getenv("POPPLER_PATH") or (r"C:\poppler\poppler-24.08.0\Library\bin" if os.name == "nt" else None)
+
+# Pages handed to a single worker per OCR task. 1 spreads a document across all cores.
+OCR_PAGES_PER_TASK = int(os.getenv("OCR_PAGES_PER_TASK", "1"))
+
+# Text-layer backend: "pymupdf" (fast) or "pdfplumber" (the original extractor).
+TEXT_BACKEND = os.getenv("TEXT_BACKEND", "pymupdf")
+
+# A page is OCR'd when its text layer has fewer than this many non-space
+# characters, or when too few of them are readable.
+MIN_PAGE_TEXT_CHARS = int(os.getenv("MIN_PAGE_TEXT_CHARS", "20"))
+MIN_READABLE_RATIO = float(os.getenv("MIN_READABLE_RATIO", "0.6"))
+
+# Rasterization for OCR: "pymupdf" renders in-process, "poppler" shells out via pdf2image.
+RASTER_BACKEND = os.getenv("RASTER_BACKEND", "pymupdf")
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+HEADER_FRACTION = 0.15
+
+_CID_GLYPH = re.compile(r"\(cid:\d+\)")
+
+
+# The PDF and OCR libraries are imported on first use rather than with this module.
+# Only the extraction workers call into them, so the API process never loads them
+# and starts without paying for their imports.
+
+def _pytesseract():
+    import pytesseract
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
+
+
+def import_backends() -> None:
+    """Imports every PDF/OCR library up front; run in each pool worker to warm it up."""
+    import pdf2image  # noqa: F401
+    import pdfplumber  # noqa: F401
+    import pymupdf  # noqa: F401
+    from PIL import Image  # noqa: F401
+    _pytesseract()
+
+
+def _open_pymupdf(file_bytes: PDFSource) -> "pymupdf.Document":
+    """Spooled uploads are opened from disk, so workers never hold a copy of the whole file."""
+    import pymupdf
+    if isinstance(file_bytes, SpooledPDF):
+        return pymupdf.open(file_bytes.path, filetype="pdf")
+    return pymupdf.open(stream=file_bytes, filetype="pdf")
+
+
+class PageImageProvider:
+    """Renders PDF pages to images one at a time.
+
+    `iter_pages` is a generator that closes each image once the caller moves on,
+    so at most one full page is held in memory. The header crop of page 1 is
+    taken whenever page 1 is rendered and kept for the lifetime of the provider,
+    because the hospital-name fallback needs it after the page has been OCR'd.
+    """
+
+    def __init__(self, file_bytes: PDFSource, dpi: int = OCR_DPI, backend: str = RASTER_BACKEND):
+        self.file_bytes = file_bytes
+        self.dpi = dpi
+        self.backend = backend
+        self._doc = _open_pymupdf(file_bytes) if backend == "pymupdf" else None
+        self._header_crop: Optional["Image.Image"] = None
+
+    def page_count(self) -> int:
+        if self._doc is not None:
+            return self._doc.page_count
+        from pdf2image import pdfinfo_from_bytes, pdfinfo_from_path
+        if isinstance(self.file_bytes, SpooledPDF):
+            return pdfinfo_from_path(self.file_bytes.path, poppler_path=POPPLER_PATH)["Pages"]
+        return pdfinfo_from_bytes(self.file_bytes, poppler_path=POPPLER_PATH)["Pages"]
+
+    def render(self, page_number: int) -> "Image.Image":
+        """Renders a single 1-based page."""
+        if self._doc is not None:
+            from PIL import Image
+            pix = self._doc[page_number - 1].get_pixmap(dpi=self.dpi)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        from pdf2image import convert_from_bytes, convert_from_path
+        if isinstance(self.file_bytes, SpooledPDF):
+            return convert_from_path(
+                self.file_bytes.path, dpi=self.dpi, first_page=page_number, last_page=page_number,
+                poppler_path=POPPLER_PATH
+            )[0]
+        return convert_from_bytes(
+            self.file_bytes, dpi=self.dpi, first_page=page_number, last_page=page_number,
+            poppler_path=POPPLER_PATH
+        )[0]
+
+    @property
+    def has_header_crop(self) -> bool:
+        return self._header_crop is not None
+
+    def _keep_header_crop(self, first_page: "Image.Image", fraction: float) -> None:
+        width, height = first_page.size
+        self._header_crop = first_page.crop((0, 0, width, int(height * fraction)))
+
+    def header_crop(self, fraction: float = HEADER_FRACTION) -> "Image.Image":
+        if self._header_crop is None:
+            with self.render(1) as first_page:
+                self._keep_header_crop(first_page, fraction)
+        return self._header_crop
+
+    def iter_pages(self, page_numbers: Optional[list[int]] = None) -> Iterator[tuple[int, "Image.Image"]]:
+        if page_numbers is None:
+            page_numbers = list(range(1, self.page_count() + 1))
+        for page_number in page_numbers:
+            image = self.render(page_number)
+            try:
+                if page_number == 1 and self._header_crop is None:
+                    self._keep_header_crop(image, HEADER_FRACTION)
+                yield page_number, image
+            finally:
+                image.close()
+
+    def close(self) -> None:
+        if self._header_crop is not None:
+            self._header_crop.close()
+            self._header_crop = None
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def __enter__(self) -> "PageImageProvider":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- Worker-side functions (run inside the extraction process pool) ---
+
+def _text_layer_pymupdf(file_bytes: PDFSource) -> list[str]:
+    with _open_pymupdf(file_bytes) as doc:
+        return [page.get_text() or "" for page in doc]
+
+
+def _text_layer_pdfplumber(file_bytes: PDFSource) -> list[str]:
+    source = file_bytes.path if isinstance(file_bytes, SpooledPDF) else io.BytesIO(file_bytes)
+    import pdfplumber
+    with pdfplumber.open(source) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+TEXT_LAYER_BACKENDS = {
+    "pymupdf": _text_layer_pymupdf,
+    "pdfplumber": _text_layer_pdfplumber,
+}
+
+
+def _ocr_page_numbers(file_bytes: PDFSource, page_numbers: Optional[list[int]]) -> tuple[list[str], Optional[str]]:
+    """OCRs the given pages (all pages if None).
+
+    When page 1 is among them, its header crop is OCR'd from the same raster and
+    returned too, so the hospital-name fallback never rasterizes page 1 again.
+    """
+    pytesseract = _pytesseract()
+    with PageImageProvider(file_bytes) as pages:
+        texts = [pytesseract.image_to_string(image) for _, image in pages.iter_pages(page_numbers)]
+        header_text = None
+        if pages.has_header_crop:
+            header_text = pytesseract.image_to_string(pages.header_crop())
+    return texts, header_text
+
+
+def page_count(file_bytes: PDFSource) -> int:
+    """Number of pages, read by the raster backend, so it works when the text layer can't be read."""
+    with PageImageProvider(file_bytes) as pages:
+        return pages.page_count()
+
+
+def ocr_page_header(file_bytes: PDFSource, fraction: float = HEADER_FRACTION) -> str:
+    """OCRs the top `fraction` of page 1, where the hospital name usually sits."""
+    with PageImageProvider(file_bytes) as pages:
+        return _pytesseract().image_to_string(pages.header_crop(fraction))
+
+
+def page_needs_ocr(text: str) -> bool:
+    """True when a page's text layer is empty, too short, or mostly unreadable glyphs."""
+    cleaned = _CID_GLYPH.sub("\ufffd", text)
+    visible = [c for c in cleaned if not c.isspace()]
+    if len(visible) < MIN_PAGE_TEXT_CHARS:
+        return True
+    readable = sum(1 for c in visible if c.isalnum() or c in ".,:;/-()%&#'\"")
+    return readable / len(visible) < MIN_READABLE_RATIO
+
+
+# --- Event-loop-side API ---
+
+_header_ocr_in_flight: dict[str, "asyncio.Future[str]"] = {}
+
+
+def _header_key(file_bytes: PDFSource) -> str:
+    return make_key("header_ocr", source_hash(file_bytes))
+
+
+async def ocr_header_text(file_bytes: PDFSource) -> str:
+    """Header OCR for page 1, shared across callers.
+
+    Served from the cache when page 1 was already OCR'd; concurrent callers for
+    the same file (e.g. the bill and discharge-summary extractions) share one render.
+    """
+    key = _header_key(file_bytes)
+    cached = text_cache.get(key)
+    if cached is not None:
+        return cached
+    if key in _header_ocr_in_flight:
+        return await _header_ocr_in_flight[key]
+
+    future = asyncio.ensure_future(run_in_extraction_pool(ocr_page_header, file_bytes))
+    _header_ocr_in_flight[key] = future
     try:
-        # ✅ First try: use pdfplumber (preferred over PyPDF2)
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            text_by_page = [page.extract_text() or "" for page in pdf.pages]
+        with stage("header_ocr"):
+            header_text = await future
+        text_cache.set(key, header_text)
+        return header_text
+    finally:
+        _header_ocr_in_flight.pop(key, None)
+
+
+async def _ocr_pages(file_bytes: PDFSource, page_numbers: list[int]) -> list[str]:
+    """OCRs the given 1-based pages, OCR_PAGES_PER_TASK pages per pool task, in order."""
+    batches = [page_numbers[i:i + OCR_PAGES_PER_TASK] for i in range(0, len(page_numbers), OCR_PAGES_PER_TASK)]
+    with stage("ocr"):
+        results = await asyncio.gather(*(
+            run_in_extraction_pool(_ocr_page_numbers, file_bytes, batch) for batch in batches
+        ))
+    for _, header_text in results:
+        if header_text is not None:
+            text_cache.set(_header_key(file_bytes), header_text)
+    return [text for texts, _ in results for text in texts]
 
-        text_combined = "".join(text_by_page).strip()
-        if text_combined and len(text_combined) > 100:
-            print("[INFO] Extracted text using pdfplumber (non-OCR)")
-            return text_by_page
 
-        raise ValueError("Insufficient text from pdfplumber, falling back to OCR")
+async def extract_text_from_pdf_by_page(file_bytes: PDFSource) -> list[str]:
+    """Returns per-page text, served from the content-addressed cache for known files."""
+    key = make_key("text", TEXT_BACKEND, source_hash(file_bytes))
+    cached = text_cache.get(key)
+    if cached is not None:
+        logger.debug("Extracted text served from cache")
+        TEXT_PATHS.inc("cache")
+        return cached
 
+    with stage("text_extraction"):
+        text_by_page = await _extract_text_uncached(file_bytes)
+    if any(text.strip() for text in text_by_page):
+        text_cache.set(key, text_by_page)
+    return text_by_page
+
+
+async def _extract_text_uncached(file_bytes: PDFSource) -> list[str]:
+    try:
+        text_by_page = await run_in_extraction_pool(TEXT_LAYER_BACKENDS[TEXT_BACKEND], file_bytes)
     except Exception as e:
-        print(f"[WARN] pdfplumber failed or empty: {e}")
+        logger.warning("%s failed to read text layer: %s", TEXT_BACKEND, e)
+        TEXT_PATHS.inc("ocr")
         try:
-            # ✅ Final fallback: OCR
-            images = convert_from_bytes(file_bytes, poppler_path=POPPLER_PATH)
-            print("[INFO] Extracting text using OCR fallback")
-            return [pytesseract.image_to_string(img) for img in images]
+            logger.info("Extracting text using OCR fallback")
+            # Split into batches like partial OCR, so a whole document isn't OCR'd on one core.
+            pages = await run_in_extraction_pool(page_count, file_bytes)
+            text_by_page = await _ocr_pages(file_bytes, list(range(1, pages + 1)))
         except Exception as ocr_error:
-            print(f"[OCR ERROR] Failed to extract with OCR: {ocr_error}")
+            logger.error("Failed to extract with OCR: %s", ocr_error)
             return []
+        PAGES.inc("ocr", amount=len(text_by_page))
+        return text_by_page
+
+    # Decide page by page: only scanned or garbled pages are rasterized.
+    ocr_pages = [i + 1 for i, text in enumerate(text_by_page) if page_needs_ocr(text)]
+    PAGES.inc("text_layer", amount=len(text_by_page) - len(ocr_pages))
+    if not ocr_pages:
+        logger.debug("Extracted text using %s (non-OCR)", TEXT_BACKEND)
+        TEXT_PATHS.inc("text_layer")
+        return text_by_page
+
+    logger.info("OCR fallback for %d/%d page(s)", len(ocr_pages), len(text_by_page))
+    TEXT_PATHS.inc("ocr" if len(ocr_pages) == len(text_by_page) else "mixed")
+    try:
+        ocr_texts = await _ocr_pages(file_bytes, ocr_pages)
+    except Exception as ocr_error:
+        logger.error("Failed to extract with OCR: %s", ocr_error)
+        return text_by_page
+    PAGES.inc("ocr", amount=len(ocr_pages))
+
+    for page_number, ocr_text in zip(ocr_pages, ocr_texts):
+        if ocr_text.strip():
+            text_by_page[page_number - 1] = ocr_text
+    return text_by_page
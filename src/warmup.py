@@ -0,0 +1,125 @@
+# src/warmup.py
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.executor import EXTRACTION_WORKERS, get_extraction_executor
+from src.gazetteer import hospital_gazetteer
+from src.llm_client import llm_client
+from src.metrics import stage
+from src.pipeline import get_graph
+from src.utils import import_backends
+
+logger = logging.getLogger(__name__)
+
+# Warm up in the background as soon as the app starts. Requests are served either way
+# (everything also loads on first use); /ready answers 503 until warm-up has finished.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+
+async def _compile_graph() -> None:
+    await asyncio.to_thread(get_graph)
+
+
+async def _build_llm_client() -> None:
+    await asyncio.to_thread(lambda: llm_client.client)
+
+
+async def _load_gazetteer() -> None:
+    await asyncio.to_thread(len, hospital_gazetteer)
+
+
+async def _start_extraction_pool() -> None:
+    """Starts the pool's workers and has each import the PDF/OCR libraries, so the first
+    file is not left waiting on a process fork and a second or two of imports."""
+    loop = asyncio.get_running_loop()
+    executor = get_extraction_executor()
+    await asyncio.gather(*(loop.run_in_executor(executor, import_backends) for _ in range(EXTRACTION_WORKERS)))
+
+
+# In-process steps run one after another (they contend for the GIL); the pool warms up alongside them.
+IN_PROCESS_STEPS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "graph": _compile_graph,
+    "llm_client": _build_llm_client,
+    "gazetteer": _load_gazetteer,
+}
+POOL_STEP = "extraction_pool"
+
+
+class WarmUp:
+    """Loads everything the first request would otherwise wait for, once per process.
+
+    Concurrent callers share the warm-up in progress; a failed warm-up can be run again.
+    Each step is timed as "warmup:<step>" in claim_stage_seconds.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return "total" in self.seconds
+
+    def start(self) -> None:
+        """Starts warm-up in the background unless it is running or done."""
+        if not self.done and (self._task is None or self._task.done()):
+            self.error = None
+            self._task = asyncio.create_task(self._run())
+
+    async def run(self) -> Dict[str, Any]:
+        """Starts warm-up if needed and waits for it. Raises RuntimeError if a step failed."""
+        self.start()
+        if self._task is not None:
+            await asyncio.shield(self._task)
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return self.status()
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def status(self) -> Dict[str, Any]:
+        if self.done:
+            state = "done"
+        elif self._task is None:
+            state = "pending"
+        elif not self._task.done():
+            state = "running"
+        else:
+            state = "failed"
+        return {"warmup": state, "seconds": dict(self.seconds), "error": self.error}
+
+    async def _step(self, name: str, step: Callable[[], Awaitable[None]]) -> None:
+        start = time.perf_counter()
+        try:
+            with stage(f"warmup:{name}"):
+                await step()
+        except Exception as e:
+            self.error = f"{name}: {type(e).__name__}: {e}"
+            raise
+        self.seconds[name] = round(time.perf_counter() - start, 4)
+
+    async def _in_process(self) -> None:
+        for name, step in IN_PROCESS_STEPS.items():
+            await self._step(name, step)
+
+    async def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(self._in_process(), self._step(POOL_STEP, _start_extraction_pool))
+        except Exception:
+            # Not re-raised: nobody may be awaiting a background warm-up. run() reports it.
+            logger.exception("Warm-up failed: %s", self.error)
+            return
+        self.seconds["total"] = round(time.perf_counter() - start, 4)
+        logger.info("Warm-up finished in %.2fs", self.seconds["total"])
+
+
+warmup = WarmUp()